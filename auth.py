@@ -0,0 +1,76 @@
+"""Login and registration forms."""
+import hashlib
+import time
+
+import streamlit as st
+
+from database import users_collection
+from settings import ADMIN_CODE
+
+
+def make_hashes(password):
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+def check_hashes(password, hashed_text):
+    if not hashed_text: return False
+    return make_hashes(password) == hashed_text
+
+
+def student_link_auth_view():
+    # Reached from a quiz link while logged out, so only student accounts are offered.
+    st.warning("Please login or register as a student.")
+    login_tab, register_tab = st.tabs(["Student Login", "Register Student"])
+    with login_tab:
+        username = st.text_input("Username", key="student_link_login_user")
+        password = st.text_input("Password", type="password", key="student_link_login_pass")
+        if st.button("Login as Student", key="student_link_login_button"):
+            user = users_collection.find_one({"username": username})
+            if user and check_hashes(password, user.get("password")):
+                if user.get("role") == "student":
+                    st.success("Logged in!"); time.sleep(1)
+                    st.session_state['logged_in'] = True; st.session_state['username'] = user['username']; st.session_state['name'] = user.get('name', username); st.session_state['role'] = 'student'
+                    st.rerun()
+                else: st.error("Not a student account.")
+            else: st.error("Incorrect username/password")
+    with register_tab:
+        st.subheader("Create New Student Account")
+        new_name = st.text_input("Full Name", key="student_link_reg_name")
+        new_username = st.text_input("Username", key="student_link_reg_user")
+        new_password = st.text_input("Password", type="password", key="student_link_reg_pass")
+        if st.button("Register as Student", key="student_link_reg_button"):
+            if not (new_name and new_username and new_password): st.warning("Fill all fields.")
+            elif users_collection.find_one({"username": new_username}): st.warning("Username exists.")
+            else:
+                try: users_collection.insert_one({"name": new_name, "username": new_username, "password": make_hashes(new_password), "role": "student"}); st.success("Account created! Go to Login.")
+                except Exception as e: st.error(f"Could not create account: {e}")
+
+
+def login_view():
+    st.title("🧠 Quiz Conductor")
+    login_tab, register_tab = st.tabs(["Login", "Register"])
+    with login_tab:
+        username = st.text_input("Username", key="main_login_user")
+        password = st.text_input("Password", type="password", key="main_login_pass")
+        if st.button("Login", key="main_login_button"):
+            user = users_collection.find_one({"username": username})
+            if user and check_hashes(password, user.get("password")):
+                st.success("Logged in!"); time.sleep(1)
+                st.session_state['logged_in'] = True; st.session_state['username'] = user['username']; st.session_state['name'] = user.get('name', username); st.session_state['role'] = user.get('role', 'student')
+                st.rerun()
+            else: st.error("Incorrect username/password")
+    with register_tab:
+        st.subheader("Create New Account")
+        new_name = st.text_input("Full Name", key="main_reg_name")
+        new_username = st.text_input("Username", key="main_reg_user")
+        new_password = st.text_input("Password", type="password", key="main_reg_pass")
+        selected_role = st.radio("Register as:", ("Student", "Host"), key="main_reg_role", horizontal=True)
+        admin_code_input = ""
+        if selected_role == "Host": admin_code_input = st.text_input("Admin Code:", type="password", key="main_reg_admin_code")
+        if st.button("Register", key="main_reg_button"):
+            if not (new_name and new_username and new_password): st.warning("Fill all fields.")
+            elif users_collection.find_one({"username": new_username}): st.warning("Username exists.")
+            else:
+                if selected_role == "Host" and admin_code_input != ADMIN_CODE: st.error("Incorrect Admin Code.")
+                else:
+                    try: users_collection.insert_one({"name": new_name, "username": new_username, "password": make_hashes(new_password), "role": selected_role.lower()}); st.success(f"Account created as '{selected_role}'! Go to Login.")
+                    except Exception as e: st.error(f"Could not create account: {e}")
@@ -0,0 +1,112 @@
+"""Stand-ins for the app's external services, used by the load-test harness.
+
+install_fake_gemini() puts a fake ``google.generativeai`` module in
+sys.modules; install_mongomock() makes pymongo.MongoClient return one shared
+in-memory mongomock client; DbOpCounter counts database operations for either
+mongomock or a real mongod (via pymongo command monitoring).
+"""
+import collections
+import json
+import re
+import sys
+import threading
+import time
+import types
+
+import pymongo
+from pymongo import monitoring
+
+MONGOMOCK_COUNTED_METHODS = ["find_one", "find", "find_one_and_update", "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many", "bulk_write", "aggregate", "count_documents", "create_index"]
+IGNORED_COMMANDS = {"ping", "hello", "isMaster", "ismaster", "endSessions", "getMore", "killCursors", "buildInfo"}
+
+
+FAKE_STEMS = ["Which statement about {topic} holds in case {n}?", "What is the main idea of {topic} shown by example {n}?", "How would you apply {topic} to scenario {n}?", "Why does {topic} matter for problem {n}?", "When is {topic} the wrong choice in situation {n}?"]
+
+
+def _fake_questions(topic, count, salt):
+    # Varied wording and answers, so the app's near-duplicate filter sees something like a real quiz.
+    return [{"question": f"[{salt}] " + FAKE_STEMS[(salt + i) % len(FAKE_STEMS)].format(topic=topic, n=i + 1), "options": [f"Option {c}" for c in "ABCD"], "answer": f"Option {'ABCD'[(salt + i) % 4]}"} for i in range(count)]
+
+
+def install_fake_gemini(latency=0.0):
+    """Register a fake google.generativeai whose models answer after `latency` seconds with valid quiz JSON."""
+    calls = {"count": 0}
+    lock = threading.Lock()
+
+    class FakeResponse:
+        def __init__(self, text):
+            part = types.SimpleNamespace(text=text)
+            self.candidates = [types.SimpleNamespace(content=types.SimpleNamespace(parts=[part]))]
+            self.prompt_feedback = None
+            self.text = text
+
+    class GenerativeModel:
+        def __init__(self, model_name, *args, **kwargs): self.model_name = model_name
+
+        def generate_content(self, prompt, **kwargs):
+            with lock: calls["count"] += 1; salt = calls["count"]
+            if latency: time.sleep(latency)
+            match = re.search(r"exactly (\d+)", prompt)
+            topic = re.search(r'about "([^"]*)"', prompt)
+            return FakeResponse("```json\n" + json.dumps(_fake_questions(topic.group(1) if topic else "Topic", int(match.group(1)) if match else 5, salt)) + "\n```")
+
+    class GenerationConfig:
+        def __init__(self, **kwargs): self.__dict__.update(kwargs)
+
+    fake = types.ModuleType("google.generativeai")
+    fake.GenerativeModel = GenerativeModel
+    fake.configure = lambda **kwargs: None
+    fake.types = types.SimpleNamespace(GenerationConfig=GenerationConfig)
+    fake.calls = calls
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.generativeai = fake
+    sys.modules["google"] = google
+    sys.modules["google.generativeai"] = fake
+    return fake
+
+
+def install_mongomock():
+    """Make every pymongo.MongoClient(...) in this process return the same mongomock client."""
+    import mongomock
+    client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: client
+    return client
+
+
+class DbOpCounter(monitoring.CommandListener):
+    """Counts DB operations by (collection, operation). Thread-safe; reset() between measurements."""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def add(self, collection, operation):
+        with self._lock: self.counts[(collection, operation)] += 1
+
+    def reset(self):
+        with self._lock: self.counts.clear()
+
+    def total(self):
+        with self._lock: return sum(self.counts.values())
+
+    # pymongo command monitoring (real mongod)
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS: return
+        self.add(str(event.command.get(event.command_name, "")), event.command_name)
+
+    def succeeded(self, event): pass
+
+    def failed(self, event): pass
+
+    def attach(self, mongomock_mode):
+        if not mongomock_mode:
+            monitoring.register(self) # Applies to clients created afterwards
+            return self
+        import mongomock.collection
+        for name in MONGOMOCK_COUNTED_METHODS:
+            original = getattr(mongomock.collection.Collection, name)
+            def counted(collection, *args, _original=original, _name=name, **kwargs):
+                self.add(collection.name, _name)
+                return _original(collection, *args, **kwargs)
+            setattr(mongomock.collection.Collection, name, counted)
+        return self
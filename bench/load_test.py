@@ -0,0 +1,285 @@
+"""Load-test and benchmark harness for the student and host flows.
+
+Drives app2.py through Streamlit's AppTest with many simulated sessions
+against mongomock (default) or a real mongod, a fake Gemini module and the
+local SendGrid stub, each with configurable latency. Reports p50/p95/p99
+rerun latency, DB operations per rerun, deadline-burst throughput and memory
+per session, and can save or compare JSON baselines:
+
+    python bench/load_test.py --students 50 --save-baseline bench/baselines/local.json
+    python bench/load_test.py --compare bench/baselines/local.json
+    python bench/load_test.py --mongo-uri mongodb://localhost:27017 --gemini-latency 2
+
+Against a real mongod the harness only touches documents whose ids start with
+"bench-" and the quiz cache and question bank entries of its "Benchmark topic"
+quizzes, and removes them afterwards.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import DbOpCounter, install_fake_gemini, install_mongomock
+
+APP_PATH = os.path.join(ROOT, "app2.py")
+PREFIX = "bench-"
+BENCH_TOPIC_PREFIX = "Benchmark topic " # Host-flow quizzes; their quiz cache and question bank entries are keyed by topic
+OPTIONS = [f"Option {c}" for c in "ABCD"]
+
+
+def percentiles(samples):
+    if not samples: return {"p50": None, "p95": None, "p99": None, "max": None, "n": 0}
+    if len(samples) == 1: return {"p50": samples[0], "p95": samples[0], "p99": samples[0], "max": samples[0], "n": 1}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(samples), "n": len(samples)}
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.mongomock_mode = not args.mongo_uri
+        os.environ["MONGO_URI"] = args.mongo_uri or "mongodb://mongomock"
+        os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+        self.gemini = install_fake_gemini(latency=args.gemini_latency)
+        self.counter = DbOpCounter()
+        if self.mongomock_mode: install_mongomock()
+        self.counter.attach(self.mongomock_mode)
+        import pymongo
+        self.db = pymongo.MongoClient(os.environ["MONGO_URI"]).quiz_app_db
+        from streamlit.testing.v1 import AppTest
+        self.AppTest = AppTest
+
+    def session(self, username, role, quiz_id=None):
+        at = self.AppTest.from_file(APP_PATH, default_timeout=self.args.timeout)
+        if quiz_id: at.query_params["quiz_id"] = quiz_id
+        at.session_state["logged_in"] = True; at.session_state["username"] = username; at.session_state["name"] = username; at.session_state["role"] = role
+        return at
+
+    def timed_run(self, at, latencies, ops_per_rerun):
+        self.counter.reset()
+        started = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - started)
+        ops_per_rerun.append(self.counter.total())
+        if at.exception: raise RuntimeError(f"App raised during benchmark: {at.exception[0].value}")
+
+    def seed_quiz(self, quiz_id, num_questions, duration_seconds):
+        questions = [{"question": f"Benchmark question {i + 1}?", "options": OPTIONS, "answer": "Option B"} for i in range(num_questions)]
+        self.db.quizzes.replace_one({"quizId": quiz_id}, {"quizId": quiz_id, "topic": "Benchmark", "durationInSeconds": duration_seconds, "questions": questions, "host": f"{PREFIX}host"}, upsert=True)
+
+    def wait_for_results(self, quiz_id, expected, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            count = self.db.results.count_documents({"quizId": quiz_id})
+            if count >= expected: return count
+            time.sleep(0.05)
+        return self.db.results.count_documents({"quizId": quiz_id})
+
+    def student_flow(self):
+        quiz_id = f"{PREFIX}student"; args = self.args
+        self.seed_quiz(quiz_id, args.questions, 3600)
+        latencies, ops = [], []
+        # Warm-up session so one-off imports and caches are not charged to the measured sessions.
+        warmup = self.session(f"{PREFIX}warmup", "student", quiz_id); warmup.run()
+        tracemalloc.start()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        sessions = []
+        for i in range(args.students):
+            at = self.session(f"{PREFIX}student-{i}", "student", quiz_id)
+            self.timed_run(at, latencies, ops)
+            next(b for b in at.button if "Start" in b.label).click()
+            self.timed_run(at, latencies, ops)
+            sessions.append(at)
+        memory_per_session = (tracemalloc.get_traced_memory()[0] - baseline_bytes) / max(1, args.students)
+        tracemalloc.stop()
+        # Steady state: every rerun below is an answer click on an in-progress attempt.
+        answer_latencies, answer_ops = [], []
+        for _ in range(args.rounds):
+            for at in sessions:
+                at.radio(key=f"q_{random.randrange(args.questions)}_{quiz_id}").set_value(random.choice(OPTIONS))
+                self.timed_run(at, answer_latencies, answer_ops)
+        started = time.perf_counter()
+        for at in sessions: next(b for b in at.button if "Submit" in b.label).click(); at.run()
+        stored = self.wait_for_results(quiz_id, len(sessions), args.timeout)
+        return {
+            "sessions": len(sessions),
+            "startRerunLatency": percentiles(latencies),
+            "startDbOpsPerRerun": statistics.mean(ops) if ops else None,
+            "answerRerunLatency": percentiles(answer_latencies),
+            "answerDbOpsPerRerun": statistics.mean(answer_ops) if answer_ops else None,
+            "memoryPerSessionBytes": memory_per_session,
+            "submitSeconds": time.perf_counter() - started,
+            "resultsStored": stored,
+        }
+
+    def deadline_burst(self):
+        quiz_id = f"{PREFIX}burst"; args = self.args
+        self.seed_quiz(quiz_id, args.questions, 60)
+        expired_start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=61)
+        self.db.active_sessions.delete_many({"quizId": quiz_id})
+        # Student i autosaved the correct answer for its first i % (questions + 1) questions, so every expected score is known.
+        expected_scores = {f"{PREFIX}burst-{i}": i % (args.questions + 1) for i in range(args.burst)}
+        self.db.active_sessions.insert_many([{"quizId": quiz_id, "studentUsername": username, "startTime": expired_start, "answers": {str(q): "Option B" if q < score else "Option A" for q in range(args.questions)}} for username, score in expected_scores.items()])
+        sessions = [self.session(f"{PREFIX}burst-{i}", "student", quiz_id) for i in range(args.burst)]
+        latencies = []
+        def expire(at):
+            started = time.perf_counter(); at.run(); latencies.append(time.perf_counter() - started)
+        self.counter.reset()
+        started = time.perf_counter()
+        # Every session resumes its already-expired attempt and the timer fragment auto-submits. AppTest cannot
+        # run scripts concurrently in one process, so reruns are back to back, as one busy worker would serve them.
+        for at in sessions: expire(at)
+        from database import get_submission_pipeline # Already imported by the sessions: the same process-wide pipeline they submitted to
+        if not get_submission_pipeline().flush_now(timeout=args.timeout): logging.warning("⚠️ Submission pipeline did not drain before the timeout")
+        stored = self.db.results.count_documents({"quizId": quiz_id})
+        elapsed = time.perf_counter() - started
+        distinct = len(self.db.results.distinct("studentUsername", {"quizId": quiz_id}))
+        wrong_scores = sum(1 for r in self.db.results.find({"quizId": quiz_id}, {"studentUsername": 1, "score": 1}) if r["score"] != expected_scores.get(r["studentUsername"]))
+        return {
+            "students": len(sessions),
+            "seconds": elapsed,
+            "submissionsPerSecond": stored / elapsed if elapsed else None,
+            "rerunLatency": percentiles(latencies),
+            "dbOps": self.counter.total(),
+            "resultsStored": stored,
+            "lost": len(sessions) - distinct,
+            "duplicates": stored - distinct,
+            "wrongScores": wrong_scores, # Results that ignored the session's autosaved answers
+            "activeSessionsLeft": self.db.active_sessions.count_documents({"quizId": quiz_id}),
+        }
+
+    def host_flow(self):
+        args = self.args
+        self.seed_quiz(f"{PREFIX}host-quiz", args.questions, 600)
+        latencies, ops = [], []
+        hosts = [self.session(f"{PREFIX}host", "host") for _ in range(args.hosts)]
+        for _ in range(args.rounds):
+            for at in hosts: self.timed_run(at, latencies, ops)
+        at = hosts[0]
+        calls_before = self.gemini.calls["count"]
+        at.text_input(key="host_topic").input(f"{BENCH_TOPIC_PREFIX}{random.random():.6f}")
+        at.number_input(key="host_num_q").set_value(args.generate_questions)
+        next(b for b in at.button if b.label.startswith("🚀")).click()
+        started = time.perf_counter(); at.run()
+        while "generation_job_id" in at.session_state and time.perf_counter() - started < args.timeout:
+            time.sleep(0.1); at.run()
+        generation_seconds = time.perf_counter() - started
+        finished_job = at.session_state["finished_generation_job"] if "finished_generation_job" in at.session_state else {}
+        return {
+            "sessions": len(hosts),
+            "dashboardRerunLatency": percentiles(latencies),
+            "dashboardDbOpsPerRerun": statistics.mean(ops) if ops else None,
+            "generationSeconds": generation_seconds,
+            "generationQuestions": args.generate_questions,
+            "questionsGenerated": finished_job.get("generated", 0) if finished_job.get("status") == "done" else 0,
+            "geminiCalls": self.gemini.calls["count"] - calls_before,
+        }
+
+    def invite_flow(self):
+        from sendgrid_stub import STATS, start_stub
+        args = self.args
+        stub = start_stub(latency=args.sendgrid_latency)
+        os.environ.update(SENDER_EMAIL=f"{PREFIX}sender@example.com", SENDGRID_API_KEY="bench-key", SENDGRID_API_HOST=f"http://127.0.0.1:{stub.server_port}")
+        at = self.session(f"{PREFIX}host", "host"); at.run()
+        at.text_area(key="invite_emails").input("\n".join(f"{PREFIX}student-{i}@example.com" for i in range(args.invites)))
+        at.button(key="invite_send_button").click()
+        started = time.perf_counter(); at.run(); elapsed = time.perf_counter() - started
+        stub.shutdown()
+        return {"invites": args.invites, "seconds": elapsed, "invitesPerSecond": args.invites / elapsed if elapsed else None, "sendgridRequests": STATS["requests"], "delivered": STATS["personalizations"]}
+
+    def cleanup(self):
+        if self.mongomock_mode: return
+        prefix = {"$regex": f"^{PREFIX}"}
+        self.db.quizzes.delete_many({"host": prefix})
+        for collection in (self.db.results, self.db.active_sessions): collection.delete_many({"quizId": prefix})
+        self.db.invite_deliveries.delete_many({"email": prefix})
+        self.db.quiz_cache.delete_many({"topic": {"$regex": f"^{BENCH_TOPIC_PREFIX}"}})
+        self.db.question_bank.delete_many({"topicKey": {"$regex": f"^{BENCH_TOPIC_PREFIX.lower()}"}})
+        self.db.generation_jobs.delete_many({"host": prefix})
+
+
+SCENARIOS = {"student": "student_flow", "burst": "deadline_burst", "host": "host_flow", "invite": "invite_flow"}
+# (scenario, metric path, lower is better) checked by --compare
+COMPARED_METRICS = [
+    ("student", "answerRerunLatency.p95", True), ("student", "answerDbOpsPerRerun", True), ("student", "memoryPerSessionBytes", True),
+    ("burst", "submissionsPerSecond", False), ("burst", "lost", True), ("burst", "duplicates", True), ("burst", "wrongScores", True),
+    ("host", "dashboardRerunLatency.p95", True), ("host", "dashboardDbOpsPerRerun", True), ("host", "generationSeconds", True), ("host", "questionsGenerated", False),
+    ("invite", "invitesPerSecond", False),
+]
+
+
+def _metric(report, scenario, path):
+    value = report.get("scenarios", {}).get(scenario)
+    for part in path.split("."): value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(report, baseline, tolerance, metrics=COMPARED_METRICS):
+    regressions = []
+    for scenario, path, lower_is_better in metrics:
+        current, previous = _metric(report, scenario, path), _metric(baseline, scenario, path)
+        if current is None or previous is None: continue
+        limit = previous * (1 + tolerance) if lower_is_better else previous * (1 - tolerance)
+        if (lower_is_better and current > limit and current - previous > 1e-9) or (not lower_is_better and current < limit):
+            regressions.append(f"{scenario}.{path}: {previous:.4g} -> {current:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--mongo-uri", default=None, help="Use a real mongod instead of mongomock")
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--rounds", type=int, default=5, help="Answer clicks per student / dashboard reruns per host")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--burst", type=int, default=200, help="Students whose deadline expires at the same moment")
+    parser.add_argument("--hosts", type=int, default=3)
+    parser.add_argument("--generate-questions", type=int, default=30)
+    parser.add_argument("--invites", type=int, default=2000)
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="Seconds per fake Gemini call")
+    parser.add_argument("--sendgrid-latency", type=float, default=0.1, help="Seconds per SendGrid stub request")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as stdout")
+    parser.add_argument("--save-baseline", default=None, help="Write the JSON report as a baseline file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression for --compare")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    harness = Harness(args)
+    report = {"createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(), "backend": "mongod" if args.mongo_uri else "mongomock", "python": platform.python_version(), "args": vars(args), "scenarios": {}}
+    try:
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            started = time.perf_counter()
+            report["scenarios"][name] = getattr(harness, SCENARIOS[name])()
+            print(f"✅ {name} finished in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally: harness.cleanup()
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    host = report["scenarios"].get("host")
+    if host and host["questionsGenerated"] < args.generate_questions:
+        # Timings of a short or failed quiz are meaningless; never let them become a baseline.
+        sys.exit(f"🚨 Host flow generated {host['questionsGenerated']} of {args.generate_questions} requested questions")
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f: f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f: regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions: print(f"🚨 Regression: {regression}", file=sys.stderr)
+        if regressions: sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
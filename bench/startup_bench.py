@@ -0,0 +1,120 @@
+"""Cold-start benchmark: first-render time and memory of a fresh worker process.
+
+Every sample is a new interpreter that renders app2.py once through AppTest
+as a student on a quiz link, a host, or a logged-out visitor, against
+mongomock (default) or a real mongod. It reports the wall time of that first
+render (which includes importing the app's modules), RSS added by it, peak
+RSS, and which heavy dependencies ended up loaded:
+
+    python bench/startup_bench.py --repeat 5
+    python bench/startup_bench.py --save-baseline bench/baselines/startup.json
+    python bench/startup_bench.py --compare bench/baselines/startup.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+APP_PATH = os.path.join(ROOT, "app2.py")
+QUIZ_ID = "bench-startup"
+ROLES = ["student", "host", "login"]
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "google.generativeai", "sendgrid", "smtplib", "email.mime.text"]
+# (role, metric, lower is better) checked by --compare
+COMPARED_METRICS = [(role, metric, True) for role in ROLES for metric in ("firstRenderSeconds", "appRssMb")]
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    except OSError: pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # Peak, where /proc is unavailable
+
+
+def child(role, mongo_uri, timeout):
+    """Render the app once for `role` in this (fresh) process and print one JSON sample."""
+    logging.disable(logging.WARNING)
+    os.environ["MONGO_URI"] = mongo_uri or "mongodb://mongomock"
+    import pymongo
+    if not mongo_uri:
+        from fakes import install_mongomock
+        install_mongomock()
+    pymongo.MongoClient(os.environ["MONGO_URI"]).quiz_app_db.quizzes.replace_one({"quizId": QUIZ_ID}, {"quizId": QUIZ_ID, "topic": "Benchmark", "durationInSeconds": 600, "host": "bench-host", "questions": [{"question": "Benchmark question?", "options": ["A", "B", "C", "D"], "answer": "B"}]}, upsert=True)
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    if role == "student": at.query_params["quiz_id"] = QUIZ_ID
+    if role in ("student", "host"): at.session_state["logged_in"] = True; at.session_state["username"] = f"bench-{role}"; at.session_state["name"] = role; at.session_state["role"] = role
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception: raise SystemExit(f"App raised: {at.exception[0].value}")
+    print(json.dumps({"firstRenderSeconds": elapsed, "appRssMb": _rss_mb() - rss_before, "peakRssMb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "heavyModules": [m for m in HEAVY_MODULES if m in sys.modules]}))
+
+
+def sample(role, args):
+    command = [sys.executable, os.path.abspath(__file__), "--child", role, "--timeout", str(args.timeout)] + (["--mongo-uri", args.mongo_uri] if args.mongo_uri else [])
+    started = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout * 2)
+    if completed.returncode != 0: raise RuntimeError(f"{role} sample failed: {completed.stderr.strip()[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["processSeconds"] = time.perf_counter() - started
+    return result
+
+
+def summarize(samples):
+    summary = {key: statistics.median(s[key] for s in samples) for key in ("firstRenderSeconds", "processSeconds", "appRssMb", "peakRssMb")}
+    summary["heavyModules"] = sorted({m for s in samples for m in s["heavyModules"]})
+    summary["samples"] = len(samples)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roles", default=",".join(ROLES), help=f"Comma-separated subset of {', '.join(ROLES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per role; medians are reported")
+    parser.add_argument("--mongo-uri", default=None, help="Use a real mongod instead of mongomock")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as stdout")
+    parser.add_argument("--save-baseline", default=None, help="Write the JSON report as a baseline file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression for --compare")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child: child(args.child, args.mongo_uri, args.timeout); return
+
+    report = {"createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(), "backend": "mongod" if args.mongo_uri else "mongomock", "python": platform.python_version(), "args": vars(args), "scenarios": {}}
+    try:
+        for role in [r.strip() for r in args.roles.split(",") if r.strip()]:
+            report["scenarios"][role] = summarize([sample(role, args) for _ in range(max(1, args.repeat))])
+            print(f"✅ {role}: first render {report['scenarios'][role]['firstRenderSeconds']:.2f}s, +{report['scenarios'][role]['appRssMb']:.0f} MB", file=sys.stderr)
+    finally:
+        if args.mongo_uri:
+            import pymongo
+            pymongo.MongoClient(args.mongo_uri).quiz_app_db.quizzes.delete_many({"quizId": QUIZ_ID})
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f: f.write(text + "\n")
+    if args.compare:
+        from load_test import compare
+        with open(args.compare) as f: regressions = compare(report, json.load(f), args.tolerance, COMPARED_METRICS)
+        for regression in regressions: print(f"🚨 Regression: {regression}", file=sys.stderr)
+        if regressions: sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""MongoDB connection, collections and the per-process resources built on them.
+
+Importing this module connects once per server process (Streamlit does not
+re-execute imported modules on rerun) and applies pending schema migrations.
+"""
+import logging
+import os
+
+import pymongo
+import streamlit as st
+
+from db_schema import apply_migrations
+from perf_metrics import METRICS, MongoCommandMonitor
+from question_bank import QuestionBank
+from quiz_cache import QuizCache, QuizDocumentCache
+from settings import ACTIVE_SESSION_TTL_SECONDS, ANSWER_AUTOSAVE_INTERVAL_SECONDS, QUIZ_CACHE_MAX_ENTRIES, QUIZ_CACHE_TTL_SECONDS, QUIZ_DOC_CACHE_MAX_ENTRIES, SUBMISSION_FLUSH_INTERVAL_SECONDS, SUBMISSION_MAX_BATCH
+from submission_pipeline import SubmissionPipeline
+
+
+@st.cache_resource
+def connect_to_db():
+    try:
+        uri = os.environ.get("MONGO_URI")
+        if not uri: st.error("🚨 MONGO_URI missing."); st.stop()
+        client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=5000, event_listeners=[MongoCommandMonitor(METRICS)])
+        client.admin.command('ping')
+        logging.info("✅ MongoDB Connected.")
+        return client.quiz_app_db
+    except Exception as e: st.error(f"🚨 DB Connection Failed: {e}"); logging.error(f"🚨 DB Error: {e}", exc_info=True); st.stop()
+
+db = connect_to_db()
+try:
+    users_collection = db.users
+    quizzes_collection = db.quizzes
+    results_collection = db.results
+    active_sessions_collection = db.active_sessions
+except Exception as e: st.error(f"🚨 DB Collection Error: {e}"); logging.error(f"🚨 DB Collection Error: {e}", exc_info=True); st.stop()
+
+
+@st.cache_resource
+def bootstrap_schema():
+    # Runs once per server process instead of on every script rerun.
+    try:
+        schema_version = apply_migrations(db, active_session_ttl_seconds=ACTIVE_SESSION_TTL_SECONDS, quiz_cache_ttl_seconds=QUIZ_CACHE_TTL_SECONDS)
+        logging.info(f"✅ Database collections ready (schema v{schema_version}).")
+    except Exception as e: st.error(f"🚨 DB Collection Error: {e}"); logging.error(f"🚨 DB Collection Error: {e}", exc_info=True); st.stop()
+    return True
+
+bootstrap_schema()
+
+
+@st.cache_resource
+def get_quiz_doc_cache():
+    return QuizDocumentCache(quizzes_collection, max_entries=QUIZ_DOC_CACHE_MAX_ENTRIES)
+
+
+@st.cache_resource
+def get_question_bank():
+    return QuestionBank(db.question_bank)
+
+
+@st.cache_resource
+def get_quiz_cache():
+    return QuizCache(db.quiz_cache, max_entries=QUIZ_CACHE_MAX_ENTRIES)
+
+
+@st.cache_resource
+def get_submission_pipeline():
+    return SubmissionPipeline(results_collection, active_sessions_collection, flush_interval=SUBMISSION_FLUSH_INTERVAL_SECONDS, max_batch=SUBMISSION_MAX_BATCH, autosave_interval=ANSWER_AUTOSAVE_INTERVAL_SECONDS)
@@ -0,0 +1,168 @@
+"""Versioned index and schema bootstrap for the quiz app database.
+
+Each migration runs once per database and is recorded in ``schema_migrations``.
+TTL lengths come from the environment and are re-synced on every bootstrap.
+The module can also be run directly to apply migrations and check that no app
+query falls back to a collection scan:
+
+    MONGO_URI=... python db_schema.py --check
+"""
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+import pymongo
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from settings import ACTIVE_SESSION_TTL_SECONDS, QUIZ_CACHE_TTL_SECONDS
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+
+def _find_duplicates(collection, key_fields, keep_sort):
+    """Return one {"_id": key, "ids": [...], "count": n} group per key held by more than one document, ids ordered by keep_sort."""
+    pipeline = [{"$sort": dict(keep_sort)}, {"$group": {"_id": {f: f"${f}" for f in key_fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}}, {"$match": {"count": {"$gt": 1}}}]
+    return list(collection.aggregate(pipeline, allowDiskUse=True))
+
+
+def _remove_duplicates(collection, key_fields, keep_sort):
+    """Delete all but the first document (by keep_sort) per key so a unique index can be built."""
+    duplicate_ids = [dup_id for group in _find_duplicates(collection, key_fields, keep_sort) for dup_id in group["ids"][1:]]
+    if duplicate_ids:
+        collection.delete_many({"_id": {"$in": duplicate_ids}})
+        logging.warning(f"⚠️ Removed {len(duplicate_ids)} duplicate documents from {collection.name} before adding a unique index")
+
+
+def ensure_ttl_index(collection, field, seconds):
+    """Create a TTL index, or change its expiry in place if it already exists with another value."""
+    try: collection.create_index(field, expireAfterSeconds=int(seconds))
+    except OperationFailure as e:
+        if e.code not in (85, 86): raise # IndexOptionsConflict / IndexKeySpecsConflict
+        collection.database.command("collMod", collection.name, index={"keyPattern": {field: 1}, "expireAfterSeconds": int(seconds)})
+
+
+def _v1_core_indexes(db):
+    db.users.create_index("username", unique=True)
+    # Duplicate quizIds are distinct quizzes (with their own results), so they are reported for a manual fix rather than deleted.
+    duplicate_quizzes = _find_duplicates(db.quizzes, ["quizId"], [("_id", 1)])
+    if duplicate_quizzes:
+        for group in duplicate_quizzes: logging.error(f"🚨 quizId {group['_id']['quizId']!r} is shared by {group['count']} quizzes: {group['ids']}")
+        raise RuntimeError(f"{len(duplicate_quizzes)} quizId values are shared by more than one quiz ({', '.join(repr(g['_id']['quizId']) for g in duplicate_quizzes[:5])}); give the extra copies new quizIds, then restart to build the unique index")
+    db.quizzes.create_index("quizId", unique=True)
+    db.quizzes.create_index("host")
+    # One result per student per quiz: repeated submits become no-ops instead of extra rows.
+    _remove_duplicates(db.results, ["quizId", "studentUsername"], [("submittedAt", 1)])
+    db.results.create_index([("quizId", 1), ("studentUsername", 1)], unique=True)
+
+
+def _v2_active_sessions(db):
+    # startTime used to be stored as epoch seconds; TTL indexes only expire BSON dates.
+    db.active_sessions.update_many({"startTime": {"$type": "number"}}, [{"$set": {"startTime": {"$toDate": {"$multiply": ["$startTime", 1000]}}}}])
+    _remove_duplicates(db.active_sessions, ["quizId", "studentUsername"], [("startTime", -1)])
+    db.active_sessions.create_index([("quizId", 1), ("studentUsername", 1)], unique=True)
+
+
+def _v3_feature_collections(db):
+    db.generation_jobs.create_index("jobId", unique=True)
+    db.generation_jobs.create_index([("requestKey", 1), ("status", 1)])
+    db.generation_jobs.create_index([("host", 1), ("status", 1), ("createdAt", -1)])
+    db.invite_deliveries.create_index([("quizId", 1), ("email", 1)], unique=True)
+
+
+def _v4_leaderboard(db):
+    db.results.create_index([("quizId", 1), ("score", -1), ("submittedAt", 1)])
+    db.results.create_index([("quizId", 1), ("_id", 1)]) # Watermark: _id is assigned by the server when the result is stored
+
+
+def _v5_question_bank(db):
+    db.question_bank.create_index([("topicKey", 1), ("difficulty", 1)])
+    db.question_bank.create_index([("topicKey", 1), ("lsh", 1)]) # Near-duplicate candidate lookup
+
+
+MIGRATIONS = [
+    (1, "Core lookup indexes and unique results per student", _v1_core_indexes),
+    (2, "Active sessions keyed by quiz and student with date startTime", _v2_active_sessions),
+    (3, "Generation job and invite delivery indexes", _v3_feature_collections),
+    (4, "Leaderboard ranking and watermark indexes", _v4_leaderboard),
+    (5, "Question bank sampling and near-duplicate indexes", _v5_question_bank),
+]
+
+
+def _sync_ttl_indexes(db, active_session_ttl_seconds, quiz_cache_ttl_seconds):
+    ensure_ttl_index(db.active_sessions, "startTime", active_session_ttl_seconds)
+    ensure_ttl_index(db.quiz_cache, "createdAt", quiz_cache_ttl_seconds)
+
+
+def apply_migrations(db, active_session_ttl_seconds=ACTIVE_SESSION_TTL_SECONDS, quiz_cache_ttl_seconds=QUIZ_CACHE_TTL_SECONDS):
+    """Apply pending migrations in order and return the resulting schema version."""
+    applied = {doc["_id"] for doc in db[MIGRATIONS_COLLECTION].find({}, {"_id": 1})}
+    for version, description, migrate in MIGRATIONS:
+        if version in applied: continue
+        logging.info(f"🛠️ Applying schema migration {version}: {description}")
+        migrate(db)
+        # Another worker process may have applied the same (idempotent) migration concurrently.
+        try: db[MIGRATIONS_COLLECTION].insert_one({"_id": version, "description": description, "appliedAt": datetime.datetime.now(datetime.timezone.utc)})
+        except DuplicateKeyError: pass
+    _sync_ttl_indexes(db, active_session_ttl_seconds, quiz_cache_ttl_seconds)
+    return MIGRATIONS[-1][0]
+
+
+# Representative shapes of every query the app issues; values are placeholders.
+APP_QUERIES = [
+    ("users", {"username": "u"}, None),
+    ("quizzes", {"quizId": "q"}, None),
+    ("quizzes", {"host": "h"}, None),
+    ("results", {"quizId": "q", "studentUsername": "u"}, None),
+    ("results", {"quizId": "q"}, None),
+    ("results", {"quizId": "q"}, [("score", -1), ("submittedAt", 1)]),
+    ("results", {"quizId": "q", "_id": {"$gt": ObjectId(b"\x00" * 12)}}, None),
+    ("results", {"quizId": "q"}, [("_id", -1)]),
+    ("results", {"quizId": {"$in": ["q", "r"]}}, [("quizId", 1), ("score", -1), ("submittedAt", 1)]),
+    ("users", {"username": {"$in": ["u", "v"]}}, None),
+    ("active_sessions", {"quizId": "q"}, None),
+    ("active_sessions", {"quizId": "q", "studentUsername": "u"}, None),
+    ("generation_jobs", {"jobId": "j"}, None),
+    ("generation_jobs", {"requestKey": "k", "status": {"$in": ["queued", "running"]}}, None),
+    ("generation_jobs", {"host": "h", "status": {"$in": ["queued", "running"]}}, [("createdAt", -1)]),
+    ("invite_deliveries", {"quizId": "q", "email": "e"}, None),
+    ("question_bank", {"topicKey": "t", "difficulty": "d"}, None),
+    ("question_bank", {"topicKey": "t", "lsh": {"$in": ["0:k"]}}, None),
+]
+
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan: yield plan["stage"]
+        for value in plan.values(): yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan: yield from _plan_stages(item)
+
+
+def find_collscans(db, queries=APP_QUERIES):
+    """Return (collection, filter) for every app query whose winning plan contains a COLLSCAN."""
+    offenders = []
+    for collection_name, query_filter, sort in queries:
+        cursor = db[collection_name].find(query_filter)
+        if sort: cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning_plan)): offenders.append((collection_name, query_filter))
+    return offenders
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply quiz app schema migrations.")
+    parser.add_argument("--check", action="store_true", help="Fail if any app query plan uses a COLLSCAN")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    uri = os.environ.get("MONGO_URI")
+    if not uri: sys.exit("🚨 MONGO_URI missing.")
+    database = pymongo.MongoClient(uri, serverSelectionTimeoutMS=5000).quiz_app_db
+    logging.info(f"✅ Schema at version {apply_migrations(database)}")
+    if args.check:
+        collscans = find_collscans(database)
+        for collection_name, query_filter in collscans: logging.error(f"🚨 COLLSCAN: {collection_name}.find({query_filter})")
+        if collscans: sys.exit(1)
+        logging.info(f"✅ All {len(APP_QUERIES)} app queries use an index.")
@@ -0,0 +1,151 @@
+"""Quiz generation: Gemini requests, the question bank and the background job queue.
+
+google.generativeai is imported and configured on the first generation
+request rather than at startup, so processes that only serve students never
+load it.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import streamlit as st
+
+from database import db, quizzes_collection, get_question_bank, get_quiz_cache
+from generation_jobs import GenerationJobQueue
+from perf_metrics import METRICS
+from question_bank import DuplicateFilter
+from quiz_cache import make_quiz_cache_key
+from quiz_parsing import QUIZ_RESPONSE_SCHEMA, parse_questions
+from settings import BANK_TOPUP_ROUNDS, GEMINI_API_KEY, GEMINI_MODEL, GENERATION_JOB_STALE_SECONDS, GENERATION_JOB_WORKERS, QUIZ_CHUNK_SIZE, QUIZ_FOLLOWUP_AVOID, QUIZ_GENERATION_WORKERS, QUIZ_PROMPT_VERSION, QUIZ_REPAIR_ROUNDS
+
+IS_API_CONFIGURED = bool(GEMINI_API_KEY)
+if IS_API_CONFIGURED: logging.info("✅ Google (Gemini) API Key found.")
+else: logging.warning("⚠️ Gemini API Key not found.")
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """Import and configure google.generativeai on first use; None if that fails."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+            except ImportError: logging.error("🚨 `google-generativeai` library not found.")
+            except Exception as e: logging.error(f"🚨 Failed to configure Gemini API: {e}", exc_info=True)
+    return _genai
+
+def _normalize_question_text(text):
+    return " ".join(str(text).lower().split())
+
+def _request_questions(topic, difficulty, num_questions, part=1, parts=1, avoid=()):
+    # Runs on generation worker threads, so it must not touch st.* -- errors are raised/logged for the caller.
+    prompt = f'Generate a multiple-choice quiz about "{topic}" (difficulty: {difficulty}) with exactly {num_questions} questions. Each question has exactly 4 distinct options, and "answer" is the exact text of the correct option.'
+    if parts > 1: prompt += f' This is part {part} of {parts} of a larger exam: focus on a distinct sub-area of the topic so questions do not overlap with other parts.'
+    if avoid: prompt += ' Do not repeat any of these existing questions: ' + " | ".join(stem[:100] for stem in avoid)
+    genai = get_genai()
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    started = time.perf_counter()
+    generation_config = genai.types.GenerationConfig(temperature=0.6, response_mime_type="application/json", response_schema=QUIZ_RESPONSE_SCHEMA)
+    try: response = model.generate_content(prompt, generation_config=generation_config, safety_settings={'HARASSMENT':'block_none','HATE_SPEECH':'block_none','SEXUAL':'block_none','DANGEROUS':'block_none'})
+    except Exception: METRICS.record_llm(GEMINI_MODEL, time.perf_counter() - started, len(prompt), 0, ok=False); raise
+    has_content = bool(response.candidates and response.candidates[0].content.parts)
+    raw_text = response.candidates[0].content.parts[0].text if has_content else ""
+    METRICS.record_llm(GEMINI_MODEL, time.perf_counter() - started, len(prompt), len(raw_text), ok=has_content)
+    if not has_content: logging.error(f"AI No candidates/parts (part {part}/{parts}). Feedback: {response.prompt_feedback}"); return []
+    # Well-formed items are kept even if others are malformed or the response was cut off.
+    questions, rejected = parse_questions(raw_text)
+    if rejected or len(questions) < num_questions: logging.warning(f"⚠️ Part {part}/{parts}: {len(questions)} of {num_questions} questions usable ({rejected} rejected).")
+    return questions
+
+def generate_quiz_with_ai(topic, difficulty, num_questions, force_regenerate=False, on_question=None):
+    # Called from generation job workers, so failures are logged and reported as None rather than via st.*
+    if not IS_API_CONFIGURED or get_genai() is None: logging.error("Gemini API not configured."); return None
+    quiz_cache = get_quiz_cache()
+    cache_key = make_quiz_cache_key(topic, difficulty, num_questions, QUIZ_PROMPT_VERSION)
+    if not force_regenerate:
+        cached_questions = quiz_cache.get(cache_key)
+        if cached_questions is not None:
+            logging.info(f"⚡ Quiz cache hit for '{topic}' ({difficulty}, {num_questions})")
+            if on_question:
+                for i, q in enumerate(cached_questions): on_question(i, q)
+            return cached_questions
+    logging.info(f"Generating quiz using Gemini AI: '{topic}' ({difficulty}, {num_questions}) 🧠")
+    chunk_sizes = [min(QUIZ_CHUNK_SIZE, num_questions - start) for start in range(0, num_questions, QUIZ_CHUNK_SIZE)]
+    questions = []; seen_questions = set(); follow_ups = 0
+    # Chunks run concurrently; results are de-duplicated and handed to on_question on this thread as each chunk lands.
+    # A chunk that comes back short only re-requests its missing questions, up to QUIZ_REPAIR_ROUNDS times.
+    with ThreadPoolExecutor(max_workers=max(1, min(QUIZ_GENERATION_WORKERS, len(chunk_sizes)))) as pool:
+        pending = {pool.submit(_request_questions, topic, difficulty, size, part, len(chunk_sizes)): (part, size, 0) for part, size in enumerate(chunk_sizes, start=1)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                part, size, attempt = pending.pop(future)
+                try: chunk = future.result()
+                except Exception as e: logging.error(f"🚨 Gemini Exception (part {part}/{len(chunk_sizes)}): {e}", exc_info=True); chunk = []
+                accepted = 0
+                for q in chunk:
+                    if len(questions) >= num_questions or accepted >= size: break
+                    question_key = _normalize_question_text(q["question"])
+                    if question_key in seen_questions: continue
+                    seen_questions.add(question_key); questions.append(q); accepted += 1
+                    if on_question: on_question(len(questions) - 1, q)
+                missing = min(size - accepted, num_questions - len(questions) - sum(s for _, s, _ in pending.values()))
+                if missing > 0 and attempt < QUIZ_REPAIR_ROUNDS:
+                    logging.info(f"🔁 Re-requesting {missing} question(s) for part {part}/{len(chunk_sizes)}")
+                    pending[pool.submit(_request_questions, topic, difficulty, missing, part, len(chunk_sizes), [q["question"] for q in questions[-QUIZ_FOLLOWUP_AVOID:]])] = (part, missing, attempt + 1)
+                    follow_ups += 1
+    if not questions: logging.error("🚨 Gemini AI failed to return any valid questions."); return None
+    logging.info(f"✅ AI Quiz Generated ({len(questions)}/{num_questions} questions, {len(chunk_sizes)} chunks, {follow_ups} follow-ups)")
+    # Only complete quizzes are cached so a partial result is retried next time.
+    if len(questions) == num_questions: quiz_cache.put(cache_key, questions, topic=topic, difficulty=difficulty, numQuestions=num_questions, promptVersion=QUIZ_PROMPT_VERSION)
+    else: logging.warning(f"⚠️ AI returned {len(questions)} of {num_questions} requested questions.")
+    return questions
+
+def generate_demo_quiz(num_questions):
+    logging.info("API key issue or AI failed. Generating demo quiz. 📚")
+    demo_questions = [{"question": "What is the capital of India?", "options": ["Mumbai", "Kolkata", "Chennai", "New Delhi"], "answer": "New Delhi"}, {"question": "Closest planet to Sun?", "options": ["Earth", "Mars", "Mercury", "Venus"], "answer": "Mercury"}, {"question": "Python list bracket?", "options": ["{}", "()", "[]", "<>"], "answer": "[]"}]
+    return demo_questions[:min(num_questions, len(demo_questions))]
+
+def run_generation_job(topic, difficulty, num_questions, force_regenerate=False, on_question=None):
+    bank = get_question_bank()
+    # Assemble from the bank first; Gemini only tops up the shortfall (or everything when forced).
+    questions = [] if force_regenerate or not topic else bank.sample(topic, difficulty, num_questions)
+    picked = DuplicateFilter(); skipped = [0]
+    for i, q in enumerate(questions):
+        picked.add(q)
+        if on_question: on_question(i, q)
+    if len(questions) == num_questions: logging.info(f"⚡ Assembled '{topic}' ({difficulty}, {num_questions}) from the question bank"); return questions, topic
+    if IS_API_CONFIGURED and topic:
+        def on_new_question(_, q):
+            # Generated questions that repeat a banked one already in this quiz are skipped.
+            if len(questions) >= num_questions: return
+            if not picked.add(q): skipped[0] += 1; return
+            questions.append(q)
+            if on_question: on_question(len(questions) - 1, q)
+        for _ in range(BANK_TOPUP_ROUNDS):
+            shortfall = num_questions - len(questions)
+            if shortfall <= 0: break
+            # A cached quiz was banked when it was generated, so top-ups must ask Gemini for fresh questions.
+            generated = generate_quiz_with_ai(topic, difficulty, shortfall, force_regenerate=force_regenerate or bool(questions), on_question=on_new_question)
+            if generated is None: break
+            try: bank.add(generated, topic, difficulty)
+            except Exception as e: logging.warning(f"⚠️ Could not bank generated questions: {e}")
+    if questions:
+        if len(questions) < num_questions: logging.warning(f"⚠️ Assembled {len(questions)} of {num_questions} requested questions ({skipped[0]} generated duplicates skipped).")
+        return questions, topic
+    if IS_API_CONFIGURED and topic:
+        METRICS.record_fallback("ai_failed")
+        return generate_demo_quiz(num_questions), "Demo (AI Failed)"
+    METRICS.record_fallback("api_not_configured" if not IS_API_CONFIGURED else "no_topic")
+    return generate_demo_quiz(num_questions), "Demo"
+
+@st.cache_resource
+def get_generation_queue():
+    get_quiz_cache(); get_question_bank() # Build the shared resources on a script thread before workers need them
+    return GenerationJobQueue(db.generation_jobs, quizzes_collection, run_generation_job, max_workers=GENERATION_JOB_WORKERS, stale_after_seconds=GENERATION_JOB_STALE_SECONDS)
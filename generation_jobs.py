@@ -0,0 +1,119 @@
+"""Background quiz-generation jobs.
+
+Hosts enqueue a job instead of running the Gemini round-trip inside their
+Streamlit script thread. A bounded worker pool runs the generation, records
+progress in the ``generation_jobs`` collection and inserts the finished quiz
+into ``quizzes``; the dashboard only polls the job document.
+
+Each job records the process that owns it, and that process heartbeats
+``updatedAt`` while the job is queued or running. A job whose heartbeat is
+older than ``stale_after_seconds`` was orphaned by a restart: it is marked
+failed the next time anything looks at it, instead of being polled forever.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import shortuuid
+from pymongo.errors import DuplicateKeyError
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+IN_FLIGHT_STATUSES = [JOB_QUEUED, JOB_RUNNING]
+ORPHANED_JOB_ERROR = "Generation was interrupted by a server restart. Please try again."
+
+
+class GenerationJobQueue:
+    """Worker pool plus job bookkeeping for quiz generation.
+
+    ``generate_fn(topic, difficulty, num_questions, force_regenerate, on_question)``
+    must return ``(questions, topic_label)`` and must not call Streamlit.
+    """
+
+    def __init__(self, jobs_collection, quizzes_collection, generate_fn, max_workers=4, stale_after_seconds=120):
+        self.jobs = jobs_collection
+        self.quizzes = quizzes_collection
+        self.generate_fn = generate_fn
+        self.stale_after_seconds = stale_after_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="quiz-gen")
+        self._in_flight = {} # requestKey -> jobId for jobs owned by this process
+        self._lock = threading.Lock()
+        threading.Thread(target=self._heartbeat, name="quiz-gen-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        # Several beats per stale window, so one slow write never makes a live job look orphaned.
+        while True:
+            time.sleep(self.stale_after_seconds / 4)
+            with self._lock: job_ids = list(self._in_flight.values())
+            if not job_ids: continue
+            try: self.jobs.update_many({"jobId": {"$in": job_ids}, "status": {"$in": IN_FLIGHT_STATUSES}}, {"$set": {"updatedAt": time.time()}})
+            except Exception as e: logging.warning(f"⚠️ Generation job heartbeat failed: {e}")
+
+    def reap_stale(self, query):
+        """Mark in-flight jobs matching query whose heartbeat stopped as failed; returns how many were reaped."""
+        now = time.time()
+        # The updatedAt condition makes this a no-op for a job that heartbeats concurrently.
+        reaped = self.jobs.update_many({**query, "status": {"$in": IN_FLIGHT_STATUSES}, "updatedAt": {"$lt": now - self.stale_after_seconds}}, {"$set": {"status": JOB_FAILED, "error": ORPHANED_JOB_ERROR, "finishedAt": now, "updatedAt": now}}).modified_count
+        if reaped: logging.warning(f"⚠️ Marked {reaped} orphaned generation jobs failed ({query})")
+        return reaped
+
+    def submit(self, host, topic, difficulty, num_questions, duration_seconds, request_key, force_regenerate=False):
+        """Queue a generation job and return its id, reusing an identical in-flight job if there is one."""
+        with self._lock:
+            if request_key in self._in_flight: return self._in_flight[request_key]
+            # Another worker process may already be running the same request, unless it died with it.
+            self.reap_stale({"requestKey": request_key})
+            existing = self.jobs.find_one({"requestKey": request_key, "status": {"$in": IN_FLIGHT_STATUSES}}, {"jobId": 1})
+            if existing: return existing["jobId"]
+            job_id = uuid.uuid4().hex[:12]
+            now = time.time()
+            self.jobs.insert_one({"jobId": job_id, "requestKey": request_key, "status": JOB_QUEUED, "owner": self.owner, "host": host, "topic": topic, "difficulty": difficulty, "numQuestions": int(num_questions), "durationInSeconds": int(duration_seconds), "generated": 0, "questions": [], "createdAt": now, "updatedAt": now})
+            self._in_flight[request_key] = job_id
+        self._pool.submit(self._run, job_id, request_key, host, topic, difficulty, int(num_questions), int(duration_seconds), force_regenerate)
+        logging.info(f"🗂️ Queued generation job {job_id} for {host}")
+        return job_id
+
+    def _update(self, job_id, update):
+        update.setdefault("$set", {})["updatedAt"] = time.time()
+        self.jobs.update_one({"jobId": job_id}, update)
+
+    def _run(self, job_id, request_key, host, topic, difficulty, num_questions, duration_seconds, force_regenerate):
+        try:
+            self._update(job_id, {"$set": {"status": JOB_RUNNING, "startedAt": time.time()}})
+            def on_question(i, q): self._update(job_id, {"$push": {"questions": q}, "$set": {"generated": i + 1}})
+            questions, topic_label = self.generate_fn(topic, difficulty, num_questions, force_regenerate, on_question)
+            if not questions or not isinstance(questions, list): raise ValueError("Failed to get valid questions.")
+            for attempt in range(3):
+                quiz_id = shortuuid.uuid()[:6]
+                # quizId is unique; short ids can collide, so draw a new one if they do.
+                try: self.quizzes.insert_one({"quizId": quiz_id, "topic": topic_label, "durationInSeconds": duration_seconds, "questions": questions, "host": host}); break
+                except DuplicateKeyError:
+                    if attempt == 2: raise
+            # The preview copy is no longer needed once the quiz document exists.
+            # A short quiz (e.g. duplicates filtered out) still succeeds, but the shortfall is recorded for the dashboard.
+            self._update(job_id, {"$set": {"status": JOB_DONE, "quizId": quiz_id, "quizTopic": topic_label, "generated": len(questions), "shortfall": max(0, num_questions - len(questions)), "finishedAt": time.time()}, "$unset": {"questions": ""}})
+            logging.info(f"✅ Generation job {job_id} finished: quiz {quiz_id}")
+        except Exception as e:
+            logging.error(f"🚨 Generation job {job_id} failed: {e}", exc_info=True)
+            try: self._update(job_id, {"$set": {"status": JOB_FAILED, "error": str(e), "finishedAt": time.time()}})
+            except Exception as db_error: logging.error(f"🚨 Could not mark job {job_id} failed: {db_error}")
+        finally:
+            with self._lock: self._in_flight.pop(request_key, None)
+
+    def get(self, job_id):
+        job = self.jobs.find_one({"jobId": job_id}, {"_id": 0})
+        if job and job["status"] in IN_FLIGHT_STATUSES and job["updatedAt"] < time.time() - self.stale_after_seconds and self.reap_stale({"jobId": job_id}):
+            job = self.jobs.find_one({"jobId": job_id}, {"_id": 0})
+        return job
+
+    def latest_for_host(self, host):
+        """Most recent in-flight job for a host, so a page refresh picks the job back up."""
+        self.reap_stale({"host": host})
+        return self.jobs.find_one({"host": host, "status": {"$in": IN_FLIGHT_STATUSES}}, {"_id": 0}, sort=[("createdAt", -1)])
@@ -0,0 +1,240 @@
+"""Host dashboard: quiz creation, live results, invites and the admin Performance tab."""
+import logging
+import time
+
+import pandas as pd
+import streamlit as st
+
+from database import db, active_sessions_collection, quizzes_collection, results_collection, get_question_bank, get_quiz_cache, get_quiz_doc_cache, get_submission_pipeline
+from generation import IS_API_CONFIGURED, get_generation_queue
+from generation_jobs import JOB_DONE, JOB_FAILED
+from invites import send_quiz_invites
+from leaderboard import refresh_leaderboard, summary_stats, ranking_page, top_k
+from perf_metrics import METRICS
+from quiz_cache import make_quiz_cache_key
+from results_export import EXPORT_FORMATS, export_results, parquet_available
+from settings import ADMIN_USERNAMES, GENERATION_POLL_SECONDS, LEADERBOARD_ACTIVE_NAMES_LIMIT, LEADERBOARD_REFRESH_SECONDS, LEADERBOARD_TOP_K, MAX_QUESTIONS_PER_QUIZ, METRICS_PORT, QUIZ_PROMPT_VERSION
+
+
+@st.fragment(run_every=GENERATION_POLL_SECONDS)
+@METRICS.timed("host:generation-status")
+def generation_job_status(job_id):
+    job = get_generation_queue().get(job_id)
+    if not job: st.warning("Generation job not found."); st.session_state.pop('generation_job_id', None); return
+    if job["status"] in (JOB_DONE, JOB_FAILED):
+        # Hand the outcome to a full rerun so this fragment stops polling.
+        st.session_state.pop('generation_job_id', None); st.session_state['finished_generation_job'] = job
+        if job["status"] == JOB_DONE: st.session_state['last_quiz_id'] = job['quizId']; st.session_state['last_quiz_topic'] = job['quizTopic']
+        st.rerun()
+    generated = job.get("generated", 0); total = max(1, job.get("numQuestions", 1))
+    st.progress(min(1.0, generated / total), text=f"{job['status'].title()}: generated {generated}/{total} questions for '{job.get('topic') or 'Demo'}'")
+    for i, q in enumerate(job.get("questions", [])): st.markdown(f"**Q{i + 1}.** {q.get('question', '')}")
+
+@METRICS.timed("host:leaderboard")
+def leaderboard_panel(quiz_id):
+    st.button("🔄 Refresh Results", key="manual_refresh_button") # Any click reruns this fragment with fresh data
+    state_key = f"leaderboard_{quiz_id}"
+    try:
+        leaderboard_state = refresh_leaderboard(results_collection, quiz_id, st.session_state.get(state_key))
+        st.session_state[state_key] = leaderboard_state
+        active_count = active_sessions_collection.count_documents({"quizId": quiz_id})
+    except Exception as e: st.error(f"Could not fetch submitted results: {e}"); return
+    stats = summary_stats(leaderboard_state, active_count)
+
+    st.subheader("Students Taking Quiz")
+    try:
+        if active_count:
+            active_names = [s.get('studentUsername', 'N/A') for s in active_sessions_collection.find({"quizId": quiz_id}, {"_id": 0, "studentUsername": 1}).limit(LEADERBOARD_ACTIVE_NAMES_LIMIT)]
+            more = f" and {active_count - len(active_names)} more" if active_count > len(active_names) else ""
+            st.info(f"Active Now ({active_count}): **{', '.join(active_names)}**{more}")
+        else: st.info("No students currently taking this quiz.")
+    except Exception as e: st.error(f"Could not fetch active students: {e}")
+    st.markdown("---")
+
+    st.subheader("Submitted Results")
+    if not stats["count"]: st.info("No results submitted yet."); return
+    col_count, col_mean, col_median, col_completion = st.columns(4)
+    col_count.metric("Submitted", stats["count"])
+    col_mean.metric("Mean score", f"{stats['mean']:.2f}/{stats['totalQuestions']}")
+    col_median.metric("Median score", f"{stats['median']:g}/{stats['totalQuestions']}")
+    col_completion.metric("Completion", f"{stats['completionRate']:.0%}")
+    try:
+        chart_col, histogram_col = st.columns(2)
+        with chart_col:
+            st.markdown(f"**Top {LEADERBOARD_TOP_K}**")
+            st.bar_chart(pd.DataFrame(top_k(results_collection, quiz_id, LEADERBOARD_TOP_K)).set_index("studentUsername")[["score"]])
+        with histogram_col:
+            st.markdown("**Score distribution**")
+            scores = range(max(stats["totalQuestions"], stats["max"]) + 1)
+            st.bar_chart(pd.DataFrame({"students": [leaderboard_state["histogram"].get(score, 0) for score in scores]}, index=pd.Index(scores, name="score")))
+
+        page_size = st.selectbox("Rows per page", [25, 50, 100], key="results_page_size")
+        page_count = max(1, -(-stats["count"] // page_size))
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1, key="results_page")
+        ranking = ranking_page(results_collection, quiz_id, page=int(page) - 1, page_size=page_size)
+        st.dataframe(pd.DataFrame(ranking, columns=["rank", "studentUsername", "score", "totalQuestions", "submittedAt"]), use_container_width=True, hide_index=True)
+    except Exception as e: st.warning(f"Chart error: {e}")
+    pipeline_stats = get_submission_pipeline().stats()
+    last_flush = f"{pipeline_stats['lastFlushSeconds'] * 1000:.0f} ms" if pipeline_stats['lastFlushSeconds'] is not None else "n/a"
+    if pipeline_stats['consecutiveFailures']: st.warning(f"{pipeline_stats['pending']} submitted results are waiting to be saved (database writes failing, retrying).")
+    st.caption(f"Updated {time.strftime('%H:%M:%S', time.localtime(leaderboard_state['refreshedAt']))} · Submission queue depth: {pipeline_stats['queueDepth']} · Last flush: {last_flush} ({pipeline_stats['lastBatchSize']} results)")
+
+
+def performance_panel():
+    st.header("Performance")
+    st.caption(f"In-memory ring buffers for this server process (last {METRICS.db_ops.maxlen} events each).")
+    st.subheader("Script reruns by view")
+    rerun_rows = METRICS.rerun_summary()
+    if rerun_rows: st.dataframe(pd.DataFrame(rerun_rows), use_container_width=True, hide_index=True)
+    else: st.info("No reruns recorded yet.")
+    st.subheader("Database operations")
+    db_rows = METRICS.db_summary()
+    if db_rows: st.dataframe(pd.DataFrame(db_rows), use_container_width=True, hide_index=True)
+    else: st.info("No database operations recorded yet.")
+    st.subheader("Gemini")
+    llm = METRICS.llm_summary()
+    col_calls, col_p50, col_p95, col_fallbacks = st.columns(4)
+    col_calls.metric("Calls (errors)", f"{llm['calls']} ({llm['errors']})")
+    col_p50.metric("p50 latency", f"{llm['p50Seconds']:.2f}s" if llm['p50Seconds'] is not None else "n/a")
+    col_p95.metric("p95 latency", f"{llm['p95Seconds']:.2f}s" if llm['p95Seconds'] is not None else "n/a")
+    col_fallbacks.metric("Demo fallbacks", llm['demoFallbacks'])
+    if llm['calls']: st.caption(f"Mean prompt {llm['meanPromptChars']:.0f} chars, mean response {llm['meanResponseChars']:.0f} chars")
+    st.subheader("Pipelines")
+    submission_stats = get_submission_pipeline().stats()
+    if submission_stats["consecutiveFailures"]:
+        st.error(f"Submission writes failing for {time.time() - submission_stats['failingSince']:.0f}s ({submission_stats['consecutiveFailures']} consecutive failed flushes, {submission_stats['pending']} results waiting): {submission_stats['lastError']}")
+    st.json({"submissions": submission_stats, "quizCache": get_quiz_cache().stats(), "quizDocumentCache": get_quiz_doc_cache().stats(), "questionBank": get_question_bank().stats()}, expanded=False)
+    metrics_text = METRICS.prometheus_text()
+    st.download_button("Download Prometheus metrics", metrics_text, "metrics.txt", mime="text/plain")
+    if METRICS_PORT: st.caption(f"Also served at :{METRICS_PORT}/metrics")
+
+
+def build_results_export(quiz_ids, fmt):
+    # Returns the spooled export as a file object. st.download_button still reads it into Streamlit's in-memory media
+    # storage to serve it, so the full payload is buffered once there; exports that do not fit in memory would need
+    # their own endpoint streaming the file.
+    try:
+        export_file, _ = export_results(db, quiz_ids, fmt)
+        return export_file
+    except Exception as e: logging.error(f"🚨 Results export failed: {e}", exc_info=True); raise
+
+
+def host_dashboard_view():
+    if st.session_state.get('role') != 'host': st.error("Access Denied."); st.stop()
+    st.sidebar.success(f"Welcome, **{st.session_state['name']}** (Host)!")
+    st.sidebar.button("Logout", on_click=lambda: st.session_state.clear())
+    st.title("Host Dashboard")
+
+    is_admin = st.session_state["username"] in ADMIN_USERNAMES
+    tab_labels = ["👨‍🏫 Create Quiz", "📊 Live Results", "📧 Invite Students"] + (["⚙️ Performance"] if is_admin else [])
+    host_tab, results_tab, invite_tab, *admin_tabs = st.tabs(tab_labels)
+
+
+    if admin_tabs:
+        with admin_tabs[0], METRICS.page("host:performance"): performance_panel()
+
+    with host_tab, METRICS.page("host:create"):
+        with st.form("quiz_creation_form"):
+            st.header("Create a New Quiz")
+            if not IS_API_CONFIGURED: st.caption("Running in Demo Mode")
+            topic = st.text_input("Topic", placeholder="e.g., Indian History", disabled=not IS_API_CONFIGURED, key="host_topic")
+            difficulty = st.selectbox("Difficulty", ["Easy", "Medium", "Hard"], disabled=not IS_API_CONFIGURED, key="host_difficulty")
+            # Number input for questions
+            num_questions = st.number_input("Number of Questions", min_value=1, max_value=MAX_QUESTIONS_PER_QUIZ, value=5, step=1, key="host_num_q")
+            # Minute input for duration
+            duration_minutes = st.number_input("Duration (Minutes)", min_value=1, value=5, step=1, key="host_duration_min")
+            force_regenerate = st.checkbox("Force regenerate (skip cache and question bank)", value=False, disabled=not IS_API_CONFIGURED, key="host_force_regen")
+            submitted = st.form_submit_button("🚀 Generate Quiz")
+
+            if submitted:
+                duration_seconds = int(duration_minutes * 60) # Convert to seconds
+                # Identical requests from the same host (double submit, refresh) share one in-flight job.
+                request_key = f"{st.session_state['username']}:{duration_seconds}:{int(force_regenerate)}:{make_quiz_cache_key(topic, difficulty, int(num_questions), QUIZ_PROMPT_VERSION)}"
+                try:
+                    st.session_state['generation_job_id'] = get_generation_queue().submit(st.session_state["username"], topic, difficulty, int(num_questions), duration_seconds, request_key, force_regenerate=force_regenerate)
+                    st.session_state.pop('finished_generation_job', None)
+                except Exception as e: st.error(f"Could not queue quiz generation: {e}"); logging.error(f"🚨 Generation queue error: {e}", exc_info=True)
+
+        if 'generation_job_id' not in st.session_state and not st.session_state.get('generation_jobs_checked'):
+            st.session_state['generation_jobs_checked'] = True
+            try:
+                in_flight_job = get_generation_queue().latest_for_host(st.session_state["username"])
+                if in_flight_job: st.session_state['generation_job_id'] = in_flight_job['jobId']
+            except Exception as e: logging.error(f"🚨 Could not look up in-flight generation jobs: {e}")
+        if st.session_state.get('generation_job_id'): generation_job_status(st.session_state['generation_job_id'])
+        finished_job = st.session_state.get('finished_generation_job')
+        if finished_job:
+            if finished_job["status"] == JOB_DONE:
+                if finished_job['quizTopic'].startswith("Demo"): st.info("API key issue or AI failed. Generated demo quiz. 📚")
+                share_link = f"{st.get_option('server.baseUrlPath')}?quiz_id={finished_job['quizId']}"
+                st.success("Quiz created! Invite students.")
+                if finished_job.get("shortfall"): st.warning(f"Only {finished_job['generated']} of {finished_job['numQuestions']} requested questions were generated; the rest were duplicates or could not be produced.")
+                st.code(share_link)
+            else: st.error(f"Failed to get valid questions: {finished_job.get('error', 'unknown error')}")
+        if IS_API_CONFIGURED:
+            cache_stats = get_quiz_cache().stats()
+            bank_stats = get_question_bank().stats()
+            st.caption(f"Quiz cache — memory hits: {cache_stats['memoryHits']}, DB hits: {cache_stats['dbHits']}, misses: {cache_stats['misses']} · Question bank — reused: {bank_stats['sampled']}, added: {bank_stats['added']}, near-duplicates skipped: {bank_stats['nearDuplicates']}")
+
+
+    with results_tab, METRICS.page("host:results"):
+        st.header("Live Leaderboard & Progress")
+
+        host_quizzes = list(quizzes_collection.find({"host": st.session_state["username"]}, {"topic": 1, "quizId": 1, "_id": 0}))
+
+        if not host_quizzes: st.info("Create a quiz first.")
+        else:
+            quiz_options = {f"{q.get('topic', 'N/A')} ({q.get('quizId', 'N/A')})": q.get('quizId', None) for q in host_quizzes}
+            quiz_options = {k: v for k, v in quiz_options.items() if v is not None}
+            if not quiz_options: st.warning("Cannot read quiz IDs."); return
+
+            selected_quiz_display = st.selectbox("Select quiz to view results:", quiz_options.keys(), key="results_quiz_select")
+            if not selected_quiz_display: return
+            selected_quiz_id = quiz_options[selected_quiz_display]
+            st.caption(f"Showing results for **{selected_quiz_id}**")
+
+            # The panel is a fragment: refreshing (manually or on the timer) reruns only the leaderboard.
+            auto_refresh = st.toggle(f"Auto-refresh every {LEADERBOARD_REFRESH_SECONDS:g}s", key="results_auto_refresh")
+            st.fragment(run_every=LEADERBOARD_REFRESH_SECONDS if auto_refresh else None)(leaderboard_panel)(selected_quiz_id)
+
+            st.markdown("---")
+            st.subheader("Export results")
+            export_scope = st.radio("Quizzes to export", ["Selected quiz", "All my quizzes"], horizontal=True, key="export_scope")
+            export_quiz_ids = [selected_quiz_id] if export_scope == "Selected quiz" else list(quiz_options.values())
+            export_format = st.radio("Format", [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or parquet_available()], format_func=str.upper, horizontal=True, key="export_format")
+            export_name = f"results_{selected_quiz_id if export_scope == 'Selected quiz' else st.session_state['username']}.{export_format}"
+            # Deferred: nothing is read until the button is clicked, and then results stream through a spooled temp file.
+            st.download_button(f"Download {export_format.upper()}", lambda: build_results_export(export_quiz_ids, export_format), export_name, mime=EXPORT_FORMATS[export_format], on_click="ignore", key="export_download")
+
+    with invite_tab, METRICS.page("host:invite"):
+         st.header("Invite Students via Email")
+         host_quizzes_invite = list(quizzes_collection.find({"host": st.session_state["username"]}, {"topic": 1, "quizId": 1, "_id": 0}))
+         if not host_quizzes_invite: st.info("Create a quiz first.")
+         else:
+              quiz_options_invite = {f"{q.get('topic', 'N/A')} ({q.get('quizId', 'N/A')})": q.get('quizId', None) for q in host_quizzes_invite}
+              quiz_options_invite = {k: v for k, v in quiz_options_invite.items() if v is not None}
+              last_quiz_id = st.session_state.get('last_quiz_id'); default_index = 0
+              if last_quiz_id:
+                   try: default_index = list(quiz_options_invite.values()).index(last_quiz_id)
+                   except ValueError: default_index = 0
+              selected_quiz_display_invite = st.selectbox("Select quiz to send invites for:", quiz_options_invite.keys(), index=default_index, key="invite_quiz_select")
+
+              if selected_quiz_display_invite:
+                   actual_quiz_id = quiz_options_invite[selected_quiz_display_invite]
+                   quiz_topic_invite = selected_quiz_display_invite.split(' (')[0]
+                   st.subheader(f"Enter emails for '{quiz_topic_invite}' ({actual_quiz_id})")
+                   emails_input = st.text_area("Emails (one per line or comma-separated):", height=150, key="invite_emails")
+                   if st.button("✉️ Send Invites", key="invite_send_button"):
+                       if not emails_input: st.warning("Please enter emails.")
+                       else:
+                            emails = [e.strip() for e in emails_input.replace(',', '\n').split('\n') if e.strip() and '@' in e]
+                            if not emails: st.warning("No valid emails found.")
+                            else:
+                                 invite_progress = st.progress(0.0, text=f"Sending {len(emails)} invites...")
+                                 delivery_records = send_quiz_invites(actual_quiz_id, quiz_topic_invite, emails, on_progress=lambda done, total: invite_progress.progress(done / total, text=f"Processed {done}/{total} addresses"))
+                                 sent_count = sum(1 for r in delivery_records if r["status"] == "sent")
+                                 failed_count = len(delivery_records) - sent_count
+                                 if sent_count > 0: st.success(f"Sent {sent_count} invites!")
+                                 if failed_count > 0: st.warning(f"{failed_count} invites failed. See the delivery status below.")
+                                 if not delivery_records or sent_count == 0: st.error("Failed to send. Check secrets.toml & logs.")
+                                 if delivery_records: st.dataframe(pd.DataFrame(delivery_records)[["email", "status", "attempts", "error"]], use_container_width=True)
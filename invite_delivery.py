@@ -0,0 +1,133 @@
+"""Batched, rate-limited SendGrid delivery for quiz invitations.
+
+Recipients are packed into multi-personalization requests (one personalization
+per address, so students never see each other) and batches are sent
+concurrently under a request rate limit. Transient failures are retried with
+exponential backoff; a batch rejected because of its recipients (HTTP 400
+whose errors all point at ``personalizations.N.to`` fields) is bisected until
+the bad addresses are isolated; any other 400 fails the batch as it is. Auth and
+permission errors fail the batch and stop the remaining ones, since no request
+could succeed. Every address ends up with a status in the delivery log.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pymongo
+from python_http_client.exceptions import HTTPError
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail
+
+SENDGRID_MAX_PERSONALIZATIONS = 1000 # Hard limit per /v3/mail/send request
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+FATAL_STATUS_CODES = {401, 403} # Bad API key or sender not allowed: stop the whole send
+RECIPIENT_ERROR_FIELD = re.compile(r"^personalizations\.\d+\.to(\.|$)")
+
+
+def _is_recipient_error(status, body):
+    """True only for a 400 whose JSON errors all name a recipient field; sender, subject or content errors would fail every half too."""
+    if status != 400: return False
+    try: errors = json.loads(body).get("errors")
+    except (TypeError, ValueError, AttributeError): return False
+    return bool(errors) and all(isinstance(e, dict) and RECIPIENT_ERROR_FIELD.match(str(e.get("field") or "")) for e in errors)
+
+
+class RateLimiter:
+    """Token bucket shared by all sender threads."""
+
+    def __init__(self, rate_per_second, burst=1):
+        self.rate = float(rate_per_second)
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0: return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class InviteDelivery:
+    def __init__(self, api_key, sender_email, deliveries_collection=None, api_host=None, batch_size=500, max_workers=4, rate_per_second=5.0, max_retries=3, backoff_seconds=1.0):
+        self.client = SendGridAPIClient(api_key=api_key, host=api_host) if api_host else SendGridAPIClient(api_key)
+        self.sender_email = sender_email
+        self.deliveries = deliveries_collection
+        self.batch_size = max(1, min(int(batch_size), SENDGRID_MAX_PERSONALIZATIONS))
+        self.max_workers = max(1, int(max_workers))
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_seconds = backoff_seconds
+
+    def _post(self, emails, subject, html):
+        """One SendGrid request with retry/backoff. Returns (ok, attempts, error, status, body); status and body are None for network errors."""
+        message = Mail(from_email=self.sender_email, to_emails=list(emails), subject=subject, html_content=html, is_multiple=True)
+        attempts = 0; error = None; body = None
+        while attempts <= self.max_retries:
+            attempts += 1
+            self.rate_limiter.acquire()
+            try:
+                response = self.client.send(message)
+                if response.status_code in (200, 201, 202): return True, attempts, None, response.status_code, None
+                status, body = response.status_code, getattr(response, "body", None)
+            except HTTPError as e: status, body = getattr(e, "status_code", None), getattr(e, "body", None)
+            except Exception as e: status, body = None, None; error = str(e) # Network errors are worth retrying
+            if status is not None:
+                error = f"HTTP {status}: {body.decode('utf-8', 'replace') if isinstance(body, bytes) else body}"
+                if status not in RETRYABLE_STATUS_CODES: return False, attempts, error, status, body
+            if attempts <= self.max_retries: time.sleep(self.backoff_seconds * (2 ** (attempts - 1)))
+        return False, attempts, error, status, body
+
+    def _send_batch(self, batch_id, emails, subject, html, abort, prior_attempts=0):
+        """abort is a per-send dict holding an Event and the fatal error that set it."""
+        if abort["event"].is_set(): return [{"email": e, "status": "failed", "attempts": prior_attempts, "error": f"Not sent: {abort['error']}", "batchId": batch_id} for e in emails]
+        ok, attempts, error, status, body = self._post(emails, subject, html)
+        attempts += prior_attempts
+        if ok: return [{"email": e, "status": "sent", "attempts": attempts, "error": None, "batchId": batch_id} for e in emails]
+        if status in FATAL_STATUS_CODES:
+            logging.error(f"🚨 SendGrid refused invite batch {batch_id} ({error}); stopping the remaining batches")
+            abort["error"] = error; abort["event"].set()
+        elif len(emails) > 1 and _is_recipient_error(status, body):
+            # A few bad addresses: bisect so they are isolated in O(log n) requests and every other recipient is still retried.
+            logging.warning(f"⚠️ Invite batch {batch_id} rejected ({error}); splitting {len(emails)} recipients")
+            middle = len(emails) // 2
+            return self._send_batch(batch_id, emails[:middle], subject, html, abort, attempts) + self._send_batch(batch_id, emails[middle:], subject, html, abort, attempts)
+        return [{"email": e, "status": "failed", "attempts": attempts, "error": error, "batchId": batch_id} for e in emails]
+
+    def _log(self, quiz_id, records):
+        if self.deliveries is None or not records: return
+        now = time.time()
+        ops = [pymongo.UpdateOne({"quizId": quiz_id, "email": r["email"]}, {"$set": {**r, "updatedAt": now}, "$setOnInsert": {"createdAt": now}}, upsert=True) for r in records]
+        try: self.deliveries.bulk_write(ops, ordered=False)
+        except Exception as e: logging.error(f"🚨 Could not write invite delivery log: {e}")
+
+    def send(self, quiz_id, subject, html, emails, on_progress=None):
+        """Deliver to every address and return one status record per unique address.
+
+        on_progress(done, total) is called on the calling thread after each batch.
+        """
+        unique_emails = list(dict.fromkeys(e.strip() for e in emails if e and '@' in e))
+        batches = [unique_emails[i:i + self.batch_size] for i in range(0, len(unique_emails), self.batch_size)]
+        records = []; abort = {"event": threading.Event(), "error": None}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(batches))), thread_name_prefix="invite-send") as pool:
+            futures = [pool.submit(self._send_batch, f"{quiz_id}-{uuid.uuid4().hex[:8]}", batch, subject, html, abort) for batch in batches]
+            for future in as_completed(futures):
+                batch_records = future.result()
+                self._log(quiz_id, batch_records)
+                records.extend(batch_records)
+                if on_progress: on_progress(len(records), len(unique_emails))
+        sent = sum(1 for r in records if r["status"] == "sent")
+        logging.info(f"✉️ Invites for {quiz_id}: {sent}/{len(unique_emails)} sent in {len(batches)} batches")
+        return records
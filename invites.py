@@ -0,0 +1,45 @@
+"""Quiz invitation emails, sent in batches through SendGrid."""
+import logging
+import os
+
+import streamlit as st
+
+from database import db
+from settings import INVITE_BATCH_SIZE, INVITE_MAX_CONCURRENCY, INVITE_MAX_RETRIES, INVITE_RATE_LIMIT_PER_SECOND
+
+
+@st.cache_resource
+def get_invite_delivery():
+    sender_email = os.environ.get("SENDER_EMAIL")
+    sg_api_key = os.environ.get("SENDGRID_API_KEY")
+    if not sg_api_key or not sender_email: return None
+    from invite_delivery import InviteDelivery # Pulls in sendgrid, so only loaded once a host sends invites
+    # SENDGRID_API_HOST lets local runs target sendgrid_stub.py instead of the real API.
+    return InviteDelivery(sg_api_key, sender_email, deliveries_collection=db.invite_deliveries, api_host=os.environ.get("SENDGRID_API_HOST"), batch_size=INVITE_BATCH_SIZE, max_workers=INVITE_MAX_CONCURRENCY, rate_per_second=INVITE_RATE_LIMIT_PER_SECOND, max_retries=INVITE_MAX_RETRIES)
+
+def send_quiz_invites(quiz_id, quiz_topic, student_emails, on_progress=None):
+    app_base_url = os.environ.get("APP_BASE_URL") or ""
+    delivery = get_invite_delivery()
+    if delivery is None:
+        st.error("SendGrid API Key or Sender Email missing in Environment Variables.")
+        return []
+
+    quiz_link = f"{app_base_url.strip('/')}?quiz_id={quiz_id}"
+    subject = f"Quiz Invitation: {quiz_topic}"
+    body_html = f"""
+    <html>
+      <body style="font-family: Arial, sans-serif;">
+        <h3>Quiz Invitation</h3>
+        <p>Hello, You are invited to take the quiz on <b>{quiz_topic}</b>.</p>
+        <p><a href='{quiz_link}' style='background-color: #4CAF50; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;'>Start Quiz Now</a></p>
+        <p>Or use this link: {quiz_link}</p>
+      </body>
+    </html>
+    """
+
+    try:
+        return delivery.send(quiz_id, subject, body_html, student_emails, on_progress=on_progress)
+    except Exception as e:
+        st.error(f"SendGrid Error: {e}")
+        logging.error(f"🚨 SendGrid Error: {e}", exc_info=True)
+        return []
@@ -0,0 +1,93 @@
+"""Server-side leaderboard for the Live Results tab.
+
+Ranking pages and the score histogram are computed by MongoDB aggregation
+pipelines, so a refresh never pulls every result into the app. The histogram
+is kept incrementally: the first load aggregates everything up to a cutoff,
+and later refreshes only fetch results stored past the watermark. The
+watermark is an ObjectId ``_id``, which the server assigns when the submission
+pipeline upserts a result, so results written late (after retries, or from a
+worker with a skewed clock) are still counted; ``submittedAt`` is only used for
+display and tie-breaking. Summary statistics are derived from the histogram.
+"""
+import datetime
+import time
+
+from bson import ObjectId
+
+LEADERBOARD_WATERMARK_LAG_SECONDS = 5 # _ids from different servers/threads are only roughly ordered; re-read this window each refresh
+
+
+def _lagged(object_id, lag_seconds):
+    return ObjectId.from_datetime(object_id.generation_time - datetime.timedelta(seconds=lag_seconds))
+
+
+def new_leaderboard_state():
+    return {"cutoff": None, "histogram": {}, "recent": {}, "totalQuestions": 0, "refreshedAt": None}
+
+
+def _add_score(state, score, total_questions, count=1):
+    state["histogram"][score] = state["histogram"].get(score, 0) + count
+    state["totalQuestions"] = max(state["totalQuestions"], total_questions or 0)
+
+
+def refresh_leaderboard(results_collection, quiz_id, state=None, lag_seconds=LEADERBOARD_WATERMARK_LAG_SECONDS):
+    """Fold results newer than the state's watermark into its score histogram and return the state.
+
+    ``state["recent"]`` remembers the results inside the lag window so they are
+    not counted twice; everything older is only represented in the histogram.
+    The watermark trails the newest stored result, so it never depends on the
+    app's clock.
+    """
+    if state is None: state = new_leaderboard_state()
+    if state["cutoff"] is None:
+        latest = results_collection.find_one({"quizId": quiz_id}, {"_id": 1}, sort=[("_id", -1)])
+        state["cutoff"] = _lagged(latest["_id"], lag_seconds) if latest else ObjectId(b"\x00" * 12)
+        pipeline = [{"$match": {"quizId": quiz_id, "_id": {"$lte": state["cutoff"]}}}, {"$group": {"_id": "$score", "count": {"$sum": 1}, "totalQuestions": {"$max": "$totalQuestions"}}}]
+        if latest:
+            for bucket in results_collection.aggregate(pipeline): _add_score(state, bucket["_id"], bucket["totalQuestions"], bucket["count"])
+    newest = None
+    for result in results_collection.find({"quizId": quiz_id, "_id": {"$gt": state["cutoff"]}}, {"studentUsername": 1, "score": 1, "totalQuestions": 1}):
+        newest = max(newest or result["_id"], result["_id"])
+        if result["studentUsername"] in state["recent"]: continue
+        state["recent"][result["studentUsername"]] = result["_id"]
+        _add_score(state, result["score"], result.get("totalQuestions"))
+    # Advance the watermark and forget results that can no longer be re-read.
+    if newest: state["cutoff"] = max(state["cutoff"], _lagged(newest, lag_seconds))
+    state["recent"] = {username: stored_id for username, stored_id in state["recent"].items() if stored_id > state["cutoff"]}
+    state["refreshedAt"] = time.time()
+    return state
+
+
+def summary_stats(state, active_count=0):
+    histogram = state["histogram"]
+    count = sum(histogram.values())
+    stats = {"count": count, "active": active_count, "mean": None, "median": None, "max": None, "completionRate": None, "totalQuestions": state["totalQuestions"]}
+    if count + active_count: stats["completionRate"] = count / (count + active_count)
+    if not count: return stats
+    stats["mean"] = sum(score * n for score, n in histogram.items()) / count
+    stats["max"] = max(histogram)
+    # Median straight from the histogram: walk the sorted buckets to the middle position(s).
+    middle_positions = [(count - 1) // 2, count // 2]; values = []; seen = 0
+    for score in sorted(histogram):
+        seen += histogram[score]
+        while len(values) < 2 and middle_positions[len(values)] < seen: values.append(score)
+    stats["median"] = sum(values) / 2
+    return stats
+
+
+def ranking_page(results_collection, quiz_id, page=0, page_size=25):
+    """One page of the ranking (score desc, earliest submission first) computed by MongoDB."""
+    pipeline = [
+        {"$match": {"quizId": quiz_id}},
+        {"$sort": {"score": -1, "submittedAt": 1}},
+        {"$skip": max(0, int(page)) * int(page_size)},
+        {"$limit": int(page_size)},
+        {"$project": {"_id": 0, "studentUsername": 1, "score": 1, "totalQuestions": 1, "submittedAt": 1}},
+    ]
+    rows = list(results_collection.aggregate(pipeline))
+    for offset, row in enumerate(rows): row["rank"] = page * page_size + offset + 1
+    return rows
+
+
+def top_k(results_collection, quiz_id, k=10):
+    return ranking_page(results_collection, quiz_id, page=0, page_size=k)
@@ -0,0 +1,188 @@
+"""In-process performance instrumentation.
+
+Collects MongoDB command timings (through pymongo command monitoring), script
+rerun timings per view and Gemini call latency/size into bounded ring buffers
+plus monotonically increasing totals. Everything lives in the module-level
+METRICS object, which survives Streamlit reruns because imported modules are
+not re-executed. The data backs the admin Performance tab and is exported in
+the Prometheus text format (optionally over HTTP on METRICS_PORT).
+"""
+import collections
+import functools
+import logging
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pymongo import monitoring
+
+BACKGROUND_PAGE = "background" # Worker and flusher threads have no page
+IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+def _quantile(values, q):
+    if not values: return None
+    if len(values) == 1: return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q * 100) - 1]
+
+
+def _labels(**labels):
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for k, v in labels.items()}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped.items()) + "}"
+
+
+class PerfMetrics:
+    def __init__(self, buffer_size=5000):
+        self.db_ops = collections.deque(maxlen=buffer_size) # (ts, page, collection, command, seconds, ok)
+        self.reruns = collections.deque(maxlen=buffer_size) # (ts, view, seconds)
+        self.llm_calls = collections.deque(maxlen=buffer_size) # (ts, model, seconds, prompt_chars, response_chars, ok)
+        self.totals = collections.Counter() # (metric, labels tuple) -> value, never reset
+        self.gauges = {} # name -> (help, fn returning {labels tuple: value})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def current_page(self):
+        stack = getattr(self._local, "pages", None)
+        return stack[-1] if stack else BACKGROUND_PAGE
+
+    @contextmanager
+    def page(self, view):
+        """Attribute DB work on this thread to `view` and record how long the block took."""
+        stack = self._local.__dict__.setdefault("pages", [])
+        stack.append(view)
+        started = time.perf_counter()
+        try: yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            self.record_rerun(view, elapsed)
+
+    def timed(self, view):
+        """Decorator form of page(), for fragments that rerun on their own."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.page(view): return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _add(self, metric, labels, value=1):
+        with self._lock: self.totals[(metric, tuple(sorted(labels.items())))] += value
+
+    def record_db(self, page, collection, command, seconds, ok=True):
+        self.db_ops.append((time.time(), page, collection, command, seconds, ok))
+        labels = {"page": page, "collection": collection, "command": command}
+        self._add("quiz_db_operations_total", labels); self._add("quiz_db_operation_seconds_total", labels, seconds)
+        if not ok: self._add("quiz_db_operation_errors_total", labels)
+
+    def record_rerun(self, view, seconds):
+        self.reruns.append((time.time(), view, seconds))
+        self._add("quiz_rerun_total", {"view": view}); self._add("quiz_rerun_seconds_total", {"view": view}, seconds)
+
+    def record_llm(self, model, seconds, prompt_chars, response_chars, ok=True):
+        self.llm_calls.append((time.time(), model, seconds, prompt_chars, response_chars, ok))
+        labels = {"model": model, "outcome": "ok" if ok else "error"}
+        self._add("quiz_llm_calls_total", labels); self._add("quiz_llm_call_seconds_total", labels, seconds)
+        self._add("quiz_llm_prompt_chars_total", {"model": model}, prompt_chars); self._add("quiz_llm_response_chars_total", {"model": model}, response_chars)
+
+    def record_fallback(self, reason):
+        self._add("quiz_demo_fallbacks_total", {"reason": reason})
+
+    def register_gauge(self, name, help_text, fn):
+        self.gauges[name] = (help_text, fn)
+
+    def db_summary(self):
+        """Per (page, collection, command) rows from the ring buffer, slowest total first."""
+        groups = collections.defaultdict(list)
+        for _, page, collection, command, seconds, _ in list(self.db_ops): groups[(page, collection, command)].append(seconds)
+        rows = [{"page": p, "collection": c, "command": cmd, "count": len(v), "totalMs": sum(v) * 1000, "meanMs": statistics.mean(v) * 1000, "p95Ms": _quantile(v, 0.95) * 1000} for (p, c, cmd), v in groups.items()]
+        return sorted(rows, key=lambda r: r["totalMs"], reverse=True)
+
+    def rerun_summary(self):
+        groups = collections.defaultdict(list)
+        for _, view, seconds in list(self.reruns): groups[view].append(seconds)
+        rows = [{"view": view, "count": len(v), "p50Ms": _quantile(v, 0.5) * 1000, "p95Ms": _quantile(v, 0.95) * 1000, "maxMs": max(v) * 1000} for view, v in groups.items()]
+        return sorted(rows, key=lambda r: r["p95Ms"], reverse=True)
+
+    def llm_summary(self):
+        calls = list(self.llm_calls)
+        latencies = [c[2] for c in calls]
+        fallbacks = sum(v for (metric, _), v in self.totals.items() if metric == "quiz_demo_fallbacks_total")
+        return {"calls": len(calls), "errors": sum(1 for c in calls if not c[5]), "p50Seconds": _quantile(latencies, 0.5), "p95Seconds": _quantile(latencies, 0.95),
+                "meanPromptChars": statistics.mean(c[3] for c in calls) if calls else None, "meanResponseChars": statistics.mean(c[4] for c in calls) if calls else None, "demoFallbacks": fallbacks}
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock: totals = list(self.totals.items())
+        by_metric = collections.defaultdict(list)
+        for (metric, labels), value in totals: by_metric[metric].append((dict(labels), value))
+        for metric in sorted(by_metric):
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_labels(**labels)} {value:g}" for labels, value in by_metric[metric])
+        # Recent-window latency quantiles from the ring buffers.
+        reruns = collections.defaultdict(list)
+        for _, view, seconds in list(self.reruns): reruns[view].append(seconds)
+        if reruns:
+            lines.append("# TYPE quiz_rerun_recent_seconds summary")
+            for view, values in sorted(reruns.items()):
+                lines.extend(f"quiz_rerun_recent_seconds{_labels(view=view, quantile=q)} {_quantile(values, q):.6f}" for q in (0.5, 0.95, 0.99))
+        llm_latencies = [c[2] for c in list(self.llm_calls)]
+        if llm_latencies:
+            lines.append("# TYPE quiz_llm_recent_seconds summary")
+            lines.extend(f"quiz_llm_recent_seconds{_labels(quantile=q)} {_quantile(llm_latencies, q):.6f}" for q in (0.5, 0.95, 0.99))
+        for name, (help_text, fn) in sorted(self.gauges.items()):
+            try: values = fn()
+            except Exception as e: logging.warning(f"⚠️ Gauge {name} failed: {e}"); continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_labels(**dict(labels)) if labels else ''} {value:g}" for labels, value in values.items())
+        lines.append("# TYPE quiz_process_uptime_seconds gauge")
+        lines.append(f"quiz_process_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+class MongoCommandMonitor(monitoring.CommandListener):
+    """Times every MongoDB command and attributes it to the page active on the issuing thread."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS: return
+        collection = event.command.get(event.command_name)
+        # started() runs on the thread that issued the command, so the page is known here.
+        with self._lock: self._in_flight[(event.request_id, event.connection_id)] = (self.metrics.current_page(), collection if isinstance(collection, str) else event.database_name, event.command_name)
+
+    def _finish(self, event, ok):
+        with self._lock: info = self._in_flight.pop((event.request_id, event.connection_id), None)
+        if info: self.metrics.record_db(*info, event.duration_micros / 1e6, ok=ok)
+
+    def succeeded(self, event): self._finish(event, True)
+
+    def failed(self, event): self._finish(event, False)
+
+
+def start_metrics_server(metrics, port):
+    """Serve metrics.prometheus_text() at http://0.0.0.0:<port>/metrics on a daemon thread."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics": self.send_response(404); self.end_headers(); return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args): pass
+    server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+METRICS = PerfMetrics()
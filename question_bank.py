@@ -0,0 +1,139 @@
+"""Shared bank of validated questions, reused across quizzes.
+
+Every question the generator produces is stored once in ``question_bank``,
+keyed by a content hash of its normalized text and options. Re-worded copies
+are caught with MinHash signatures over character shingles of the question
+text, indexed with LSH band keys (a multikey ``lsh`` field) so candidate
+near-duplicates are found with one indexed query instead of comparing against
+the whole topic. Short stems that differ in one entity ("capital of France" /
+"capital of Spain") or one number ("atomic number 6" / "atomic number 8") look
+alike at any threshold, so a near-duplicate must also have the same correct
+answer and the same numbers in its stem. Quizzes are assembled by
+``$sample``-ing the bank for a topic and difficulty; only the shortfall has to
+be generated.
+"""
+import datetime
+import hashlib
+import logging
+import random
+import threading
+
+from pymongo import UpdateOne
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 4 # Characters per shingle; word n-grams are too sparse for one-line stems
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 32 # 32 bands x 2 rows: pairs at the threshold share a band with >99.9% probability
+NEAR_DUPLICATE_THRESHOLD = 0.6 # Reworded copies measure ~0.6-0.75; distinct same-answer stems reach ~0.5
+
+_rng = random.Random(1729) # Fixed seed: signatures are stored, so the permutations must never change
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def normalize_text(text):
+    return " ".join("".join(c if c.isalnum() else " " for c in str(text).lower()).split())
+
+
+def topic_key(topic):
+    return " ".join(str(topic).lower().split())
+
+
+def content_hash(q):
+    payload = normalize_text(q["question"]) + "\x1f" + "\x1f".join(sorted(normalize_text(o) for o in q["options"]))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _shingles(text):
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE: return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in _shingles(text)]
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def lsh_keys(signature):
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    return [f"{band}:" + hashlib.blake2b(repr(signature[band * rows:(band + 1) * rows]).encode(), digest_size=6).hexdigest() for band in range(LSH_BANDS)]
+
+
+def near_duplicate_key(q):
+    """Questions are only compared by signature when their answers and stem numbers match."""
+    numbers = [t for t in normalize_text(q["question"]).split() if t.isdigit()]
+    return normalize_text(q["answer"]) + "\x1f" + " ".join(numbers)
+
+
+def similarity(sig_a, sig_b):
+    """MinHash estimate of the Jaccard similarity of two questions' shingle sets."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERMUTATIONS
+
+
+class DuplicateFilter:
+    """In-memory near-duplicate check for the questions of one quiz being assembled."""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._hashes = set()
+        self._buckets = {} # LSH key -> [(signature, near_duplicate_key)]
+
+    def add(self, q, signature=None):
+        """Accept q unless it duplicates an accepted question; returns True if accepted."""
+        digest = content_hash(q)
+        if digest in self._hashes: return False
+        signature = signature or minhash(q["question"])
+        keys = lsh_keys(signature); gate = near_duplicate_key(q)
+        if any(other_gate == gate and similarity(signature, other) >= self.threshold for key in keys for other, other_gate in self._buckets.get(key, [])): return False
+        self._hashes.add(digest)
+        for key in keys: self._buckets.setdefault(key, []).append((signature, gate))
+        return True
+
+
+class QuestionBank:
+    def __init__(self, collection, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.collection = collection
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.stats_counters = {"added": 0, "exactDuplicates": 0, "nearDuplicates": 0, "sampled": 0, "samplesShort": 0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items(): self.stats_counters[name] += delta
+
+    def sample(self, topic, difficulty, n):
+        """Up to n random questions for the topic and difficulty, shaped like generated ones."""
+        if n <= 0: return []
+        pipeline = [{"$match": {"topicKey": topic_key(topic), "difficulty": difficulty}}, {"$sample": {"size": int(n)}}, {"$project": {"_id": 0, "question": 1, "options": 1, "answer": 1}}]
+        questions = list(self.collection.aggregate(pipeline))
+        self._count(sampled=len(questions), samplesShort=int(len(questions) < n))
+        return questions
+
+    def add(self, questions, topic, difficulty, source="gemini"):
+        """Store questions that are not already in the bank (exactly or nearly); returns how many were new."""
+        key = topic_key(topic)
+        batch = DuplicateFilter(self.threshold)
+        candidates = []
+        for q in questions:
+            signature = minhash(q["question"])
+            if batch.add(q, signature): candidates.append((q, content_hash(q), signature, lsh_keys(signature)))
+            else: self._count(exactDuplicates=1)
+        if not candidates: return 0
+        # One indexed query finds every stored question sharing an LSH band with the batch.
+        all_keys = sorted({k for *_, keys in candidates for k in keys})
+        stored = {doc["_id"]: (doc["minhash"], near_duplicate_key(doc)) for doc in self.collection.find({"topicKey": key, "lsh": {"$in": all_keys}}, {"minhash": 1, "question": 1, "answer": 1})}
+        now = datetime.datetime.now(datetime.timezone.utc)
+        ops = []
+        for q, digest, signature, keys in candidates:
+            if digest in stored: self._count(exactDuplicates=1); continue
+            if any(other_gate == near_duplicate_key(q) and similarity(signature, other) >= self.threshold for other, other_gate in stored.values()): self._count(nearDuplicates=1); continue
+            doc = {"topicKey": key, "topic": topic, "difficulty": difficulty, "question": q["question"], "options": q["options"], "answer": q["answer"], "minhash": signature, "lsh": keys, "source": source, "createdAt": now}
+            ops.append(UpdateOne({"_id": digest}, {"$setOnInsert": doc}, upsert=True))
+        if not ops: return 0
+        upserted = self.collection.bulk_write(ops, ordered=False).upserted_count
+        self._count(added=upserted)
+        logging.info(f"🏦 Banked {upserted} new questions for '{topic}' ({difficulty})")
+        return upserted
+
+    def stats(self):
+        with self._lock: return dict(self.stats_counters)
@@ -0,0 +1,147 @@
+"""In-process caches for quiz data.
+
+QuizCache is a two-tier cache for AI-generated quizzes: an in-process LRU sits
+in front of a MongoDB collection whose documents expire through a TTL index, so
+repeat generations of the same topic/difficulty/size skip the Gemini call
+entirely. QuizDocumentCache keeps immutable quiz documents in memory so
+student reruns do not hit MongoDB.
+"""
+import copy
+import datetime
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU with hit/miss counters."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, int(max_entries))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries: self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock: return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "maxEntries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+def make_quiz_cache_key(topic, difficulty, num_questions, prompt_version):
+    # Case and whitespace differences in the topic should not defeat the cache.
+    normalized_topic = " ".join(str(topic).lower().split())
+    raw = json.dumps([normalized_topic, str(difficulty).strip().lower(), int(num_questions), str(prompt_version)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuizCache:
+    """Memory LRU -> MongoDB (TTL) lookup for generated question lists."""
+
+    def __init__(self, collection, max_entries=256):
+        self.collection = collection
+        self.memory = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _count(self, counter):
+        with self._lock: setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        questions = self.memory.get(key)
+        if questions is not None:
+            self._count("memory_hits")
+            return copy.deepcopy(questions)
+        try:
+            doc = self.collection.find_one({"_id": key}, {"questions": 1})
+        except Exception as e:
+            logging.warning(f"⚠️ Quiz cache DB lookup failed: {e}")
+            doc = None
+        if doc and isinstance(doc.get("questions"), list):
+            self.memory.put(key, doc["questions"])
+            self._count("db_hits")
+            return copy.deepcopy(doc["questions"])
+        self._count("misses")
+        return None
+
+    def put(self, key, questions, **meta):
+        self.memory.put(key, copy.deepcopy(questions))
+        doc = {"questions": questions, "createdAt": datetime.datetime.now(datetime.timezone.utc), **meta}
+        try: self.collection.replace_one({"_id": key}, doc, upsert=True)
+        except Exception as e: logging.warning(f"⚠️ Quiz cache DB write failed: {e}")
+
+    def invalidate(self, key):
+        self.memory.pop(key)
+        try: self.collection.delete_one({"_id": key})
+        except Exception as e: logging.warning(f"⚠️ Quiz cache DB delete failed: {e}")
+
+    def stats(self):
+        return {"memoryHits": self.memory_hits, "dbHits": self.db_hits, "misses": self.misses, "memorySize": len(self.memory)}
+
+
+# Named projections for quiz documents. The student view never loads answers;
+# scoring reads them separately through the "answers" view.
+QUIZ_DOCUMENT_VIEWS = {
+    "student": {"_id": 0, "questions.answer": 0},
+    "answers": {"_id": 0, "quizId": 1, "questions.answer": 1},
+}
+
+
+class QuizDocumentCache:
+    """Read-through, versioned cache for quiz documents.
+
+    Quizzes are immutable once created, so a document is read from MongoDB once
+    per process and shared by every session. invalidate() bumps the quiz's
+    version so older entries (including ones a concurrent reader is about to
+    store) are never served again. Returned documents are shared: treat them
+    as read-only.
+    """
+
+    def __init__(self, collection, max_entries=512):
+        self.collection = collection
+        self.memory = LRUCache(max_entries)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id, view="student"):
+        key = (quiz_id, view, self._versions.get(quiz_id, 0))
+        doc = self.memory.get(key)
+        if doc is None:
+            doc = self.collection.find_one({"quizId": quiz_id}, QUIZ_DOCUMENT_VIEWS[view])
+            if doc is None: return None # Unknown ids are not cached, so a quiz created later is found
+            self.memory.put(key, doc)
+        return doc
+
+    def invalidate(self, quiz_id=None):
+        if quiz_id is None: self.memory.clear(); return
+        with self._lock: self._versions[quiz_id] = self._versions.get(quiz_id, 0) + 1
+
+    def stats(self):
+        return self.memory.stats()
@@ -0,0 +1,85 @@
+"""Tolerant parsing and per-question repair of Gemini quiz responses.
+
+Gemini is asked for JSON matching QUIZ_RESPONSE_SCHEMA, but a response can
+still be fenced, truncated, or contain one malformed item. parse_questions()
+decodes the array item by item, so every well-formed question is kept, and
+repair_question() fixes what can be fixed safely (letter answers such as
+"B", "A) " option prefixes, case/whitespace mismatches) and rejects the rest.
+The caller re-requests only the rejected or missing questions.
+"""
+import json
+import re
+
+QUIZ_RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "question": {"type": "string"},
+            "options": {"type": "array", "items": {"type": "string"}, "min_items": 4, "max_items": 4},
+            "answer": {"type": "string", "description": "Exact text of the correct option"},
+        },
+        "required": ["question", "options", "answer"],
+    },
+}
+
+OPTION_LETTERS = "ABCD"
+ITEM_START = re.compile(r"[\[,]\s*(\{)")
+OPTION_PREFIX = re.compile(r"^\s*\(?([A-Da-d])[\).:\-]\s+")
+LETTER_ANSWER = re.compile(r"^\s*(?:option\s+)?\(?([A-Da-d])\)?[\).:]?\s*$", re.IGNORECASE)
+
+
+def _fold(text):
+    return " ".join(str(text).lower().split())
+
+
+def _strip_option_prefixes(options):
+    # Only strip when all four options are labelled A-D in order, so real text like "C. elegans" survives.
+    matches = [OPTION_PREFIX.match(o) for o in options]
+    if all(m and m.group(1).upper() == OPTION_LETTERS[i] for i, m in enumerate(matches)): return [o[m.end():].strip() for o, m in zip(options, matches)]
+    return options
+
+
+def repair_question(q):
+    """Return a cleaned {"question", "options", "answer"} dict, or None if q cannot be trusted."""
+    if not isinstance(q, dict) or not isinstance(q.get("question"), str) or not q["question"].strip(): return None
+    options = q.get("options")
+    if not isinstance(options, list) or len(options) != 4 or not all(isinstance(o, (str, int, float)) and str(o).strip() for o in options): return None
+    options = _strip_option_prefixes([str(o).strip() for o in options])
+    if len({_fold(o) for o in options}) != 4: return None
+    answer = q.get("answer")
+    if not isinstance(answer, (str, int, float)) or isinstance(answer, bool): return None
+    answer = str(answer).strip()
+    if answer not in options:
+        folded = {_fold(o): o for o in options}
+        letter = LETTER_ANSWER.match(answer)
+        prefixed = OPTION_PREFIX.match(answer)
+        if _fold(answer) in folded: answer = folded[_fold(answer)]
+        elif letter: answer = options[OPTION_LETTERS.index(letter.group(1).upper())]
+        elif prefixed and _fold(answer[prefixed.end():]) in folded: answer = folded[_fold(answer[prefixed.end():])]
+        else: return None
+    return {"question": q["question"].strip(), "options": options, "answer": answer}
+
+
+def _iter_items(text):
+    """Yield every JSON value that decodes cleanly as an element of the top-level array."""
+    decoder = json.JSONDecoder()
+    resume_at = 0
+    for match in ITEM_START.finditer(text):
+        start = match.start(1)
+        if start < resume_at: continue # Inside an item that already decoded
+        try: item, end = decoder.raw_decode(text, start)
+        except ValueError: continue # Malformed or truncated item: skip to the next item boundary
+        resume_at = end
+        yield item
+
+
+def parse_questions(text):
+    """Return (repaired questions, number of items rejected) from a raw model response."""
+    text = (text or "").strip()
+    try: parsed = json.loads(text)
+    except ValueError: parsed = None
+    if isinstance(parsed, dict): parsed = parsed.get("questions")
+    items = parsed if isinstance(parsed, list) else list(_iter_items(text))
+    questions = [q for q in (repair_question(item) for item in items) if q]
+    return questions, len(items) - len(questions)
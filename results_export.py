@@ -0,0 +1,112 @@
+"""Streaming export of quiz results to CSV or Parquet.
+
+Results are read from a cursor in fixed-size chunks, joined with quiz topics
+and student names (one ``$in`` lookup per chunk), and written straight to a
+SpooledTemporaryFile that moves to disk once it outgrows ``spool_max_bytes``.
+Memory therefore stays bounded by the chunk size whether the export covers one
+quiz or every quiz a host has run. The result is handed back as a file object
+(an ``io.RawIOBase`` view, which ``st.download_button`` accepts) rather than as
+bytes. Parquet needs pyarrow, which is imported
+only when a Parquet export is requested.
+"""
+import csv
+import datetime
+import importlib.util
+import io
+import logging
+import tempfile
+
+EXPORT_COLUMNS = ["quizId", "quizTopic", "studentUsername", "studentName", "score", "totalQuestions", "percent", "submittedAt"]
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+EXPORT_CHUNK_SIZE = 1000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class ExportFile(io.RawIOBase):
+    """Read-only, seekable view of a finished export; closing it removes the spooled file."""
+
+    def __init__(self, spooled):
+        self._spooled = spooled
+
+    def readable(self): return True
+    def seekable(self): return True
+    def seek(self, offset, whence=io.SEEK_SET): return self._spooled.seek(offset, whence)
+    def tell(self): return self._spooled.tell()
+
+    def readinto(self, buffer):
+        data = self._spooled.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed: self._spooled.close()
+        super().close()
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _submitted_at(value):
+    if isinstance(value, (int, float)): return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+    return value
+
+
+def iter_result_chunks(db, quiz_ids, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of export rows (dicts keyed by EXPORT_COLUMNS), at most chunk_size per list."""
+    topics = {q["quizId"]: q.get("topic") for q in db.quizzes.find({"quizId": {"$in": list(quiz_ids)}}, {"_id": 0, "quizId": 1, "topic": 1})}
+    cursor = db.results.find({"quizId": {"$in": list(quiz_ids)}}, {"_id": 0, "quizId": 1, "studentUsername": 1, "score": 1, "totalQuestions": 1, "submittedAt": 1}).sort([("quizId", 1), ("score", -1), ("submittedAt", 1)]).batch_size(chunk_size)
+    chunk = []
+    for result in cursor:
+        chunk.append(result)
+        if len(chunk) >= chunk_size: yield _join_names(db, chunk, topics); chunk = []
+    if chunk: yield _join_names(db, chunk, topics)
+
+
+def _join_names(db, results, topics):
+    usernames = list({r.get("studentUsername") for r in results})
+    names = {u["username"]: u.get("name") for u in db.users.find({"username": {"$in": usernames}}, {"_id": 0, "username": 1, "name": 1})}
+    rows = []
+    for r in results:
+        score, total = r.get("score"), r.get("totalQuestions")
+        rows.append({"quizId": r.get("quizId"), "quizTopic": topics.get(r.get("quizId")), "studentUsername": r.get("studentUsername"), "studentName": names.get(r.get("studentUsername")),
+                     "score": score, "totalQuestions": total, "percent": round(100.0 * score / total, 2) if score is not None and total else None, "submittedAt": _submitted_at(r.get("submittedAt"))})
+    return rows
+
+
+def _write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.DictWriter(text, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for rows in chunks:
+        writer.writerows({**row, "submittedAt": row["submittedAt"].isoformat() if isinstance(row["submittedAt"], datetime.datetime) else row["submittedAt"]} for row in rows)
+        count += len(rows)
+    text.flush(); text.detach() # Leave `out` open for the caller
+    return count
+
+
+def _write_parquet(chunks, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([("quizId", pa.string()), ("quizTopic", pa.string()), ("studentUsername", pa.string()), ("studentName", pa.string()), ("score", pa.int64()), ("totalQuestions", pa.int64()), ("percent", pa.float64()), ("submittedAt", pa.timestamp("ms", tz="UTC"))])
+    count = 0
+    # Each chunk becomes one row group, so only one chunk is ever held as Arrow data.
+    with pq.ParquetWriter(out, schema, compression="snappy") as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(rows)
+    return count
+
+
+def export_results(db, quiz_ids, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE, spool_max_bytes=SPOOL_MAX_BYTES):
+    """Write results for quiz_ids in `fmt`; returns (ExportFile rewound to the start, row count). The caller closes the file."""
+    if fmt not in EXPORT_FORMATS: raise ValueError(f"Unsupported export format: {fmt}")
+    out = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, mode="w+b")
+    try:
+        write = _write_parquet if fmt == "parquet" else _write_csv
+        count = write(iter_result_chunks(db, quiz_ids, chunk_size), out)
+    except Exception: out.close(); raise
+    out.seek(0)
+    logging.info(f"✅ Exported {count} results for {len(quiz_ids)} quizzes as {fmt}")
+    return ExportFile(out), count
@@ -0,0 +1,68 @@
+"""Local stand-in for the SendGrid v3 mail/send endpoint.
+
+Point the app at it with SENDGRID_API_HOST=http://127.0.0.1:8025 (any
+SENDGRID_API_KEY works) to exercise invite delivery without sending mail:
+
+    python sendgrid_stub.py --port 8025 --latency 0.2 --fail-rate 0.1
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATS = {"requests": 0, "personalizations": 0, "failures": 0}
+_stats_lock = threading.Lock()
+
+
+def make_handler(latency=0.0, fail_rate=0.0, reject_domain=None):
+    class SendGridStubHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, body=b""):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if latency: time.sleep(latency)
+            recipients = [to.get("email", "") for p in payload.get("personalizations", []) for to in p.get("to", [])]
+            with _stats_lock: STATS["requests"] += 1
+            if reject_domain and any(r.endswith("@" + reject_domain) for r in recipients):
+                with _stats_lock: STATS["failures"] += 1
+                return self._reply(400, json.dumps({"errors": [{"message": "Does not contain a valid address.", "field": "personalizations.0.to.0.email"}]}).encode())
+            if random.random() < fail_rate:
+                with _stats_lock: STATS["failures"] += 1
+                return self._reply(random.choice([429, 503]))
+            with _stats_lock: STATS["personalizations"] += len(recipients)
+            self._reply(202)
+
+        def do_GET(self):
+            with _stats_lock: body = json.dumps(STATS).encode()
+            self._reply(200, body)
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+    return SendGridStubHandler
+
+
+def start_stub(port=0, latency=0.0, fail_rate=0.0, reject_domain=None):
+    """Start the stub on a daemon thread and return the server (server.server_port has the bound port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, fail_rate, reject_domain))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering each request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument("--reject-domain", default=None, help="Answer 400 for batches containing this domain")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency, args.fail_rate, args.reject_domain))
+    logging.info(f"📮 SendGrid stub listening on http://127.0.0.1:{args.port} (GET / for stats)")
+    server.serve_forever()
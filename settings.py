@@ -0,0 +1,33 @@
+"""Environment-driven settings shared by the app modules."""
+import os
+
+ADMIN_CODE = os.environ.get("ADMIN_CODE")
+ADMIN_USERNAMES = {u.strip() for u in os.environ.get("ADMIN_USERNAMES", "").split(",") if u.strip()} # Hosts who can see the Performance tab
+METRICS_PORT = os.environ.get("METRICS_PORT") # Serve Prometheus metrics at :METRICS_PORT/metrics when set
+GEMINI_MODEL = 'gemini-2.5-flash'
+QUIZ_PROMPT_VERSION = "v2" # Bump whenever the prompt changes so stale cached quizzes are not reused
+QUIZ_CACHE_TTL_SECONDS = int(os.environ.get("QUIZ_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get("QUIZ_CACHE_MAX_ENTRIES", 256))
+LEADERBOARD_REFRESH_SECONDS = float(os.environ.get("LEADERBOARD_REFRESH_SECONDS", 5))
+LEADERBOARD_TOP_K = int(os.environ.get("LEADERBOARD_TOP_K", 10))
+LEADERBOARD_ACTIVE_NAMES_LIMIT = 50
+SUBMISSION_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SUBMISSION_FLUSH_INTERVAL_SECONDS", 0.2))
+SUBMISSION_MAX_BATCH = int(os.environ.get("SUBMISSION_MAX_BATCH", 500))
+ANSWER_AUTOSAVE_INTERVAL_SECONDS = float(os.environ.get("ANSWER_AUTOSAVE_INTERVAL_SECONDS", 2))
+ANSWER_DEADLINE_GRACE_SECONDS = float(os.environ.get("ANSWER_DEADLINE_GRACE_SECONDS", 2)) # Answer changes arriving this late after the deadline still count
+ACTIVE_SESSION_TTL_SECONDS = int(os.environ.get("ACTIVE_SESSION_TTL_SECONDS", 6 * 3600))
+QUIZ_DOC_CACHE_MAX_ENTRIES = int(os.environ.get("QUIZ_DOC_CACHE_MAX_ENTRIES", 512))
+MAX_QUESTIONS_PER_QUIZ = 100
+QUIZ_CHUNK_SIZE = int(os.environ.get("QUIZ_CHUNK_SIZE", 10)) # Questions per Gemini call; large quizzes are split into parallel chunks
+QUIZ_GENERATION_WORKERS = int(os.environ.get("QUIZ_GENERATION_WORKERS", 4))
+QUIZ_REPAIR_ROUNDS = int(os.environ.get("QUIZ_REPAIR_ROUNDS", 2)) # Follow-up requests per chunk for questions that were missing or invalid
+QUIZ_FOLLOWUP_AVOID = 20 # Existing question stems listed in a follow-up prompt so it does not repeat them
+GENERATION_JOB_WORKERS = int(os.environ.get("GENERATION_JOB_WORKERS", 4)) # Quizzes generated concurrently per server process
+GENERATION_POLL_SECONDS = float(os.environ.get("GENERATION_POLL_SECONDS", 2))
+GENERATION_JOB_STALE_SECONDS = float(os.environ.get("GENERATION_JOB_STALE_SECONDS", 120)) # Jobs without a heartbeat this long were orphaned by a restart
+BANK_TOPUP_ROUNDS = 2 # Gemini calls allowed to fill what the question bank cannot supply
+INVITE_BATCH_SIZE = int(os.environ.get("INVITE_BATCH_SIZE", 500)) # Recipients per SendGrid request (max 1000)
+INVITE_MAX_CONCURRENCY = int(os.environ.get("INVITE_MAX_CONCURRENCY", 4))
+INVITE_RATE_LIMIT_PER_SECOND = float(os.environ.get("INVITE_RATE_LIMIT_PER_SECOND", 5))
+INVITE_MAX_RETRIES = int(os.environ.get("INVITE_MAX_RETRIES", 3))
+GEMINI_API_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -0,0 +1,128 @@
+"""Student quiz-taking view."""
+import datetime
+import logging
+import time
+
+import pymongo
+import streamlit as st
+
+from database import active_sessions_collection, results_collection, get_quiz_doc_cache, get_submission_pipeline
+from perf_metrics import METRICS
+from settings import ANSWER_DEADLINE_GRACE_SECONDS
+
+
+def submit_quiz(quiz_id, student_username, user_answers):
+    try:
+        answer_key = get_quiz_doc_cache().get(quiz_id, "answers")
+        questions = answer_key.get("questions", []) if answer_key else []
+        score = sum(1 for i, q in enumerate(questions) if isinstance(q,dict) and user_answers.get(str(i)) == q.get('answer'))
+        result_data = {"quizId": quiz_id, "studentUsername": student_username, "score": score, "totalQuestions": len(questions), "submittedAt": time.time()}
+        # Written in batches by the pipeline as an upsert on (quizId, studentUsername), which also clears the active session.
+        get_submission_pipeline().submit(result_data)
+        st.session_state[f'submitted_{quiz_id}_{student_username}'] = True
+        st.session_state[f'final_score_{quiz_id}_{student_username}'] = f"{score}/{len(questions)}"
+        logging.info(f"✅ Queued result for {student_username}")
+    except Exception as e:
+        st.error("Failed to save result.")
+        logging.error(f"🚨 ERROR in submit_quiz DB: {e}", exc_info=True)
+
+def resume_attempt(quiz_id, student_username, quiz_data, session_doc):
+    start_time = session_doc["startTime"]
+    if isinstance(start_time, datetime.datetime):
+        # pymongo returns naive UTC datetimes
+        start_time = (start_time if start_time.tzinfo else start_time.replace(tzinfo=datetime.timezone.utc)).timestamp()
+    st.session_state[f'quiz_started_{quiz_id}_{student_username}'] = True
+    st.session_state[f'deadline_{quiz_id}_{student_username}'] = start_time + quiz_data.get('durationInSeconds', 60) # Read the correct key name from DB
+    st.session_state[f'saved_answers_{quiz_id}_{student_username}'] = session_doc.get("answers", {})
+
+def past_deadline(quiz_id, student_username):
+    # The deadline lives in server-side session state, so neither radio clicks nor missing timer ticks from the browser can extend it.
+    return time.time() > st.session_state[f'deadline_{quiz_id}_{student_username}'] + ANSWER_DEADLINE_GRACE_SECONDS
+
+def collect_answers(quiz_id, student_username, num_questions):
+    # Only answers recorded before the deadline are scored: autosaved ones from a resumed attempt, rendered defaults and in-time changes.
+    recorded_answers = st.session_state.get(f'saved_answers_{quiz_id}_{student_username}', {})
+    return {str(i): recorded_answers.get(str(i)) for i in range(num_questions)}
+
+def autosave_answer(quiz_id, student_username, question_index):
+    widget_key = f"q_{question_index}_{quiz_id}"
+    recorded_answers = st.session_state[f'saved_answers_{quiz_id}_{student_username}']
+    if past_deadline(quiz_id, student_username):
+        # Too late: put the widget back so the answer shown is the one that gets scored.
+        st.session_state[widget_key] = recorded_answers.get(str(question_index))
+        logging.info(f"⏰ Ignored answer change from {student_username} after the deadline")
+        return
+    recorded_answers[str(question_index)] = st.session_state.get(widget_key)
+    get_submission_pipeline().autosave(quiz_id, student_username, question_index, recorded_answers[str(question_index)])
+
+@st.fragment(run_every=1)
+@METRICS.timed("student:timer")
+def quiz_timer(quiz_id, student_username, deadline, num_questions):
+    # Ticks on its own every second; the deadline comes from active_sessions.startTime, not the browser.
+    time_left = max(0, deadline - time.time())
+    st.markdown(f"### **Time Left: {int(time_left // 60):02d}:{int(time_left % 60):02d}**")
+    if time_left <= 0:
+        st.warning("Time's up! Auto-submitting...")
+        submit_quiz(quiz_id, student_username, collect_answers(quiz_id, student_username, num_questions))
+        st.rerun()
+
+@st.fragment
+@METRICS.timed("student:question")
+def quiz_question(quiz_id, student_username, i, q, num_questions):
+    # Each question is its own fragment, so a radio click reruns only this block; the deadline is checked here too.
+    if past_deadline(quiz_id, student_username):
+        submit_quiz(quiz_id, student_username, collect_answers(quiz_id, student_username, num_questions))
+        st.rerun()
+    st.markdown(f"**Q {i+1}: {q['question']}**")
+    options = q.get("options", [])
+    if isinstance(options, list) and len(options) == 4:
+        recorded_answers = st.session_state[f'saved_answers_{quiz_id}_{student_username}']
+        index = options.index(recorded_answers[str(i)]) if recorded_answers.get(str(i)) in options else 0
+        recorded_answers[str(i)] = options[index] # The preselected option counts as the answer until it is changed
+        st.radio(f"Options Q{i+1}", options, index=index, key=f"q_{i}_{quiz_id}", label_visibility="collapsed", on_change=autosave_answer, args=(quiz_id, student_username, i))
+    else: st.warning(f"Skipping Q{i+1}: Invalid options.")
+
+def student_quiz_view(quiz_id):
+    st.title("🧠 Take Quiz")
+    if not st.session_state.get('logged_in') or st.session_state.get('role') != 'student': st.warning("Login as student."); st.stop()
+    student_username = st.session_state['username']; st.sidebar.success(f"Welcome, {st.session_state['name']} (Student)")
+    quiz_data = get_quiz_doc_cache().get(quiz_id, "student")
+    if not quiz_data: st.error("Invalid Quiz ID."); return
+    submitted_key = f'submitted_{quiz_id}_{student_username}'; score_key = f'final_score_{quiz_id}_{student_username}'
+    result_checked_key = f'result_checked_{quiz_id}_{student_username}'
+    # A previous result can only appear through this session's own submit once checked, so look it up once per session.
+    if not st.session_state.get(submitted_key) and not st.session_state.get(result_checked_key):
+        prev_result = get_submission_pipeline().pending_result(quiz_id, student_username) or results_collection.find_one({"quizId": quiz_id, "studentUsername": student_username}, {"_id": 0, "score": 1, "totalQuestions": 1})
+        st.session_state[result_checked_key] = True
+        if prev_result: st.session_state[submitted_key] = True; st.session_state[score_key] = f"{prev_result['score']}/{prev_result['totalQuestions']}"
+        else:
+            # A refresh starts a new Streamlit session: pick an existing attempt back up with its server-side clock and answers.
+            session_doc = active_sessions_collection.find_one({"quizId": quiz_id, "studentUsername": student_username}, {"_id": 0, "startTime": 1, "answers": 1})
+            if session_doc: resume_attempt(quiz_id, student_username, quiz_data, session_doc)
+    if st.session_state.get(submitted_key): st.success(f"Completed! Score: {st.session_state.get(score_key, 'N/A')}"); st.balloons(); return
+
+    started_key = f'quiz_started_{quiz_id}_{student_username}'
+    if not st.session_state.get(started_key):
+        st.subheader(f"Topic: {quiz_data.get('topic', 'N/A')}")
+        st.info(f"Student: {student_username}")
+        if st.button("🚀 Start Quiz"):
+            try:
+                logging.info(f"Recording active session for {student_username}")
+                # $setOnInsert keeps the original start time if the attempt already exists, so restarting never resets the clock.
+                session_doc = active_sessions_collection.find_one_and_update({"quizId": quiz_id, "studentUsername": student_username}, {"$setOnInsert": {"startTime": datetime.datetime.now(datetime.timezone.utc), "quizId": quiz_id, "studentUsername": student_username}}, projection={"_id": 0, "startTime": 1, "answers": 1}, upsert=True, return_document=pymongo.ReturnDocument.AFTER)
+            except Exception as e: st.error("Could not record session start."); logging.error(f"🚨 ERROR recording active session: {e}", exc_info=True); return
+            resume_attempt(quiz_id, student_username, quiz_data, session_doc)
+            st.rerun()
+    else: # Quiz in progress
+        questions = quiz_data.get("questions", [])
+        if not isinstance(questions, list): st.error("Quiz data error."); return
+        quiz_timer(quiz_id, student_username, st.session_state[f'deadline_{quiz_id}_{student_username}'], len(questions))
+
+        col1, col2 = st.columns(2)
+        for i, q in enumerate(questions):
+            if isinstance(q, dict) and "question" in q and "options" in q:
+                target_col = col1 if i % 2 == 0 else col2
+                with target_col: quiz_question(quiz_id, student_username, i, q, len(questions))
+            else: st.warning(f"Skipping Q{i+1}: Invalid format.")
+
+        if st.button("✅ Submit Quiz"): submit_quiz(quiz_id, student_username, collect_answers(quiz_id, student_username, len(questions))); st.rerun()
@@ -0,0 +1,152 @@
+"""Batched, idempotent persistence of quiz submissions.
+
+submit_quiz only enqueues the scored result; a single flusher thread per
+process drains the queue every ``flush_interval`` seconds (or as soon as
+``max_batch`` results are waiting) and writes the whole batch with two
+``bulk_write`` calls: upserts into ``results`` keyed on (quizId,
+studentUsername) and deletes from ``active_sessions``. A deadline burst of
+thousands of students therefore costs a handful of round trips, and a result
+that is written twice is a no-op rather than a duplicate row. A result that
+cannot be written stays queued and is retried with capped exponential backoff
+for the life of the process; persistent failures are reported by stats().
+
+The same thread also persists in-progress answers: autosave() only records the
+latest answer per question in memory, and every ``autosave_interval`` seconds
+all pending answers are written to ``active_sessions`` in one bulk_write, so a
+burst of radio clicks from one student coalesces into a single update.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class SubmissionPipeline:
+    def __init__(self, results_collection, active_sessions_collection, flush_interval=0.2, max_batch=500, max_backoff=30.0, autosave_interval=2.0):
+        self.results = results_collection
+        self.active_sessions = active_sessions_collection
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, int(max_batch))
+        self.max_backoff = max_backoff
+        self._consecutive_failures = 0
+        self.autosave_interval = autosave_interval
+        self._autosaves = {} # (quizId, studentUsername) -> {questionIndex: answer}, latest value wins
+        self._last_autosave = time.monotonic()
+        self._queue = queue.Queue()
+        self._pending = {} # (quizId, studentUsername) -> result, until it is durably written
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats_counters = {"submitted": 0, "written": 0, "alreadyRecorded": 0, "retried": 0, "failedFlushes": 0, "consecutiveFailures": 0, "failingSince": None, "lastError": None, "flushes": 0, "autosavesWritten": 0, "lastFlushSeconds": None, "maxFlushSeconds": 0.0, "lastBatchSize": 0, "maxQueueDepth": 0}
+        self._thread = threading.Thread(target=self._run, name="submission-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, result):
+        """Queue a scored result dict (must contain quizId and studentUsername)."""
+        key = (result["quizId"], result["studentUsername"])
+        with self._lock:
+            if key in self._pending: return # Double submit while the first is still queued
+            self._pending[key] = result
+            self._autosaves.pop(key, None) # The final answers supersede anything not yet autosaved
+            self.stats_counters["submitted"] += 1
+        self._queue.put((result, 1))
+        self.stats_counters["maxQueueDepth"] = max(self.stats_counters["maxQueueDepth"], self._queue.qsize())
+
+    def autosave(self, quiz_id, student_username, question_index, answer):
+        with self._lock: self._autosaves.setdefault((quiz_id, student_username), {})[str(question_index)] = answer
+
+    def pending_result(self, quiz_id, student_username):
+        with self._lock: return self._pending.get((quiz_id, student_username))
+
+    def _next_batch(self):
+        try: batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty: return []
+        # Give a burst a moment to accumulate so it is written as one batch.
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try: batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty: break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch: self._flush(batch)
+            if time.monotonic() - self._last_autosave >= self.autosave_interval: self._flush_autosaves()
+
+    def _flush_autosaves(self):
+        self._last_autosave = time.monotonic()
+        with self._lock: autosaves, self._autosaves = self._autosaves, {}
+        if not autosaves: return
+        # No upsert: an answer that arrives after the attempt was submitted (session deleted) is simply dropped.
+        ops = [UpdateOne({"quizId": quiz_id, "studentUsername": username}, {"$set": {f"answers.{i}": answer for i, answer in answers.items()}}) for (quiz_id, username), answers in autosaves.items()]
+        try:
+            self.active_sessions.bulk_write(ops, ordered=False)
+            self.stats_counters["autosavesWritten"] += len(ops)
+        except Exception as e:
+            logging.warning(f"⚠️ Autosave of {len(ops)} sessions failed, will retry: {e}")
+            with self._lock:
+                for key, answers in autosaves.items():
+                    if key not in self._pending: self._autosaves[key] = {**answers, **self._autosaves.get(key, {})}
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        results = [result for result, _ in batch]
+        failed_indexes = set(); retry_all = False
+        try:
+            # No _id in the upsert: the server assigns one at insert time, which the leaderboard watermark relies on.
+            self.results.bulk_write([UpdateOne({"quizId": r["quizId"], "studentUsername": r["studentUsername"]}, {"$setOnInsert": r}, upsert=True) for r in results], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                # A duplicate key means a concurrent upsert already stored this student's result.
+                if write_error.get("code") == DUPLICATE_KEY_ERROR: self.stats_counters["alreadyRecorded"] += 1
+                else: failed_indexes.add(write_error["index"]); self.stats_counters["lastError"] = write_error.get("errmsg")
+        except Exception as e:
+            logging.error(f"🚨 Submission flush failed for {len(batch)} results: {e}", exc_info=self._consecutive_failures == 0)
+            retry_all = True; self.stats_counters["lastError"] = str(e)
+        if not retry_all:
+            written = [r for i, r in enumerate(results) if i not in failed_indexes]
+            try:
+                if written: self.active_sessions.bulk_write([DeleteOne({"quizId": r["quizId"], "studentUsername": r["studentUsername"]}) for r in written], ordered=False)
+            except Exception as e: logging.warning(f"⚠️ Could not remove {len(written)} active sessions (they will expire via TTL): {e}")
+            with self._lock:
+                for r in written: self._pending.pop((r["quizId"], r["studentUsername"]), None)
+            self.stats_counters["written"] += len(written)
+        # Failed results are never dropped: the student has already been shown their score.
+        for i, (result, attempt) in enumerate(batch):
+            if not retry_all and i not in failed_indexes: continue
+            self._queue.put((result, attempt + 1)); self.stats_counters["retried"] += 1
+        if retry_all or failed_indexes:
+            self._consecutive_failures += 1
+            self.stats_counters.update(failedFlushes=self.stats_counters["failedFlushes"] + 1, consecutiveFailures=self._consecutive_failures, failingSince=self.stats_counters["failingSince"] or time.time())
+            backoff = min(self.max_backoff, self.flush_interval * 2 ** self._consecutive_failures)
+            logging.warning(f"⚠️ {len(failed_indexes) if not retry_all else len(batch)} submissions re-queued; retrying in {backoff:.1f}s (failure {self._consecutive_failures})")
+            self._stop.wait(backoff)
+        else:
+            self._consecutive_failures = 0
+            self.stats_counters.update(consecutiveFailures=0, failingSince=None)
+        elapsed = time.monotonic() - started
+        self.stats_counters.update(flushes=self.stats_counters["flushes"] + 1, lastFlushSeconds=elapsed, maxFlushSeconds=max(self.stats_counters["maxFlushSeconds"], elapsed), lastBatchSize=len(batch))
+        logging.info(f"✅ Flushed {len(batch)} submissions in {elapsed * 1000:.0f} ms")
+
+    def flush_now(self, timeout=10.0):
+        """Block until everything queued so far has been written (or timeout); returns False on timeout. Used at shutdown and by the deadline-burst benchmark."""
+        deadline = time.monotonic() + timeout
+        while self._queue.qsize() or self._pending:
+            if time.monotonic() > deadline: return False
+            time.sleep(self.flush_interval / 4)
+        return True
+
+    def close(self):
+        if not self.flush_now(): logging.error(f"🚨 Shutting down with {len(self._pending)} submissions still unwritten")
+        self._flush_autosaves()
+        self._stop.set()
+
+    def stats(self):
+        return {**self.stats_counters, "queueDepth": self._queue.qsize(), "pending": len(self._pending)}